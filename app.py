@@ -11,23 +11,51 @@ OneDev Backend API - Complete Enhanced Version with CORRECT PARAMETERS
 - FIXED: Correct Group Parameters
 """
 
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, request, jsonify, render_template, g
 from flask_cors import CORS
 import requests
 import yaml
-import boto3
 import json
 import os
 from datetime import datetime
-import tempfile
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from email.utils import parsedate_to_datetime
+import io
 import re
+import heapq
+import xml.etree.ElementTree as ET
 import logging
+import logging.handlers
+import queue
+import sys
+import atexit
+import contextvars
+import bisect
+import threading
+import time
+import hashlib
+import random
+import copy
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
 
 app = Flask(__name__)
 CORS(app)
 
+# Logging
+LOG_LEVEL = "INFO"  # DEBUG adds GitLab request/response payloads
+LOG_FORMAT = "text"  # "text": key=value lines, "json": one JSON object per line
+LOG_DEBUG_BODY_CHARS = 1000  # Response body logged at DEBUG level
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")  # Accepted incoming X-Request-ID values
+
+# Metrics (/api/metrics, Prometheus text format)
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
 # Configuration CORRIGÉE avec les bons paramètres
 GITLAB_BASE_URL = "https://gitlab.com"
 ONEDEV_GROUP_ID = "110200461"  # TechopsOneDev group ID (CORRECT)
@@ -35,44 +63,1012 @@ ONEDEV_GROUP_NAME = "techopsonedev"  # TechopsOneDev group path (CORRECT)
 AWS_REGION = "eu-west-3"
 BEDROCK_MODEL_ID = "amazon.nova-pro-v1:0"
 S3_BUCKET_NAME = "onedev-pipeline-logs"  # S3 bucket for pipeline logs
+S3_FETCH_CONCURRENCY = 8  # Parallel get_object calls per pipeline
+S3_FETCH_BUDGET_SECONDS = 20  # Time budget to fetch one pipeline's logs
+S3_READ_MODE = "window"  # "window": ranged head+tail reads, "full": whole objects
+S3_LOG_MAX_BYTES = 5 * 1024 * 1024  # Hard cap per object in "full" mode
+LOG_HEAD_CHARS = 256  # Start of each log kept for analysis (setup context)
+LOG_TAIL_CHARS = 768  # End of each log kept for analysis (errors, summaries)
+LOG_TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+# Local pre-filtering of logs before Bedrock
+LOG_PREFILTER = True  # Parse report artifacts and keep only error/warning lines
+ARTIFACT_MAX_RECORDS = 200  # Typed records kept per parsed report (counts always cover everything)
+PREFILTER_MAX_LINES = 40  # Findings/log lines kept per file
+PREFILTER_MESSAGE_CHARS = 300  # Longest single finding sent to the model
+
+# Bedrock analysis cache (content-addressed: prompt + model ID)
+ANALYSIS_CACHE_SIZE = 256  # Analyses kept in memory
+ANALYSIS_CACHE_TTL = 24 * 3600  # Seconds before an analysis is recomputed
+ANALYSIS_CACHE_DIR = None  # Directory for the on-disk backend (None disables it)
+ANALYSIS_CACHE_DISK_MAX_ENTRIES = 5000  # Files kept in ANALYSIS_CACHE_DIR
+
+# Chunked (map-reduce) analysis
+ANALYSIS_MODES = ("single", "chunked", "incremental")
+ANALYSIS_MODE = "single"  # Default: "single" prompt, "chunked" map-reduce or per-stage "incremental"
+ANALYSIS_PROMPT_LOG_CHARS = 4000  # Log characters a single prompt carries
+CHARS_PER_TOKEN = 4  # Rough prompt size estimate used for budgeting
+ANALYSIS_TOKEN_BUDGET = 30000  # Log tokens summarized per chunked analysis
+ANALYSIS_CHUNK_CHARS = 6000  # Characters of log per map call
+ANALYSIS_MAP_CONCURRENCY = 4  # Parallel map calls per analysis
+ANALYSIS_MAP_TIMEOUT = 60  # Seconds for the whole map phase before reducing what is done
+ANALYSIS_MAP_MAX_TOKENS = 300  # Completion tokens per chunk summary
+ANALYSIS_CHUNKED_HEAD_BYTES = 8 * 1024  # Start of each log read in chunked mode
+ANALYSIS_CHUNKED_TAIL_BYTES = 56 * 1024  # End of each log read in chunked mode
+
+# Streamed Bedrock analysis
+BEDROCK_STREAM_DEADLINE = 60  # Seconds before a streamed analysis returns what it has
+
+# Bedrock throttling, retries and circuit breaker (shared by every request)
+BEDROCK_RATE_LIMIT = 2.0  # Global model invocations per second
+BEDROCK_RATE_BURST = 5  # Invocations allowed in a burst above the steady rate
+BEDROCK_MAX_CONCURRENCY = 8  # Invocations in flight at once, streams included
+BEDROCK_QUEUE_TIMEOUT = 30  # Seconds a call waits for a slot before failing fast
+BEDROCK_MAX_RETRIES = 3  # Retries of throttled/unavailable calls
+BEDROCK_BACKOFF_BASE = 0.5  # Seconds; retry n sleeps uniform(0, min(cap, base * 2^n))
+BEDROCK_BACKOFF_CAP = 8  # Longest single retry sleep
+BEDROCK_BREAKER_THRESHOLD = 5  # Consecutive failed calls that open the circuit
+BEDROCK_BREAKER_COOLDOWN = 30  # Seconds the circuit stays open before a trial call
+
+# Background health probes (/api/health answers from their cached results)
+HEALTH_PROBE_INTERVAL = 30  # Seconds between probe rounds
+HEALTH_PROBE_TIMEOUT = 5  # Seconds a probe may take before it is reported down
+HEALTH_PROBE_STALE_AFTER = 90  # Seconds after which a result is reported as stale
+
+# Asynchronous analysis jobs
+ANALYSIS_WORKERS = 4  # Concurrent S3 + Bedrock analyses, separate from request workers
+ANALYSIS_QUEUE_MAX = 100  # Queued + running jobs accepted before rejecting with 503
+ANALYSIS_JOB_TTL = 3600  # Seconds a finished job's result stays retrievable
+ANALYSIS_JOB_HISTORY = 1000  # Max finished jobs retained
+ANALYSIS_JOB_STREAM_HEARTBEAT = 15  # Seconds between keep-alives on a job's event stream
+
+# GitLab HTTP connection pool
+GITLAB_POOL_SIZE = 20  # Keep-alive connections kept open to gitlab.com
+GITLAB_MAX_RETRIES = 3  # Retries on 429/5xx and connection errors
+GITLAB_BACKOFF_FACTOR = 0.5  # Seconds, doubled on every retry
+GITLAB_MAX_RETRY_AFTER = 30  # Upper bound honored for Retry-After headers
+GITLAB_RATE_LIMIT = 10.0  # Global GitLab API requests per second (all workers)
+GITLAB_RATE_BURST = 20  # Requests allowed in a burst above the steady rate
+
+# GitLab auth caches (token validation and group access)
+GITLAB_AUTH_CACHE_SIZE = 1024  # Max tokens remembered per cache
+GITLAB_TOKEN_CACHE_TTL = 300  # Seconds a validated token is trusted
+GITLAB_GROUP_CACHE_TTL = 900  # Seconds a group access check is trusted
+
+# .gitlab-ci.yml generation
+YML_CACHE_SIZE = 512  # Distinct (tool selection, Python version) pipelines memoized
+YML_TOOL_CATEGORIES = OrderedDict([  # Tool category -> generated test job, in job order
+    ("Unit Tests", "unit_tests"),
+    ("Code Quality", "code_quality"),
+    ("Security", "security_scan")
+])
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)  # libyaml emitter when available
+YML_DEPENDENCY_CACHE = "keyed"  # "keyed": per requirements.txt/Python cache + prepare job, "shared": one cache
+YML_TOOLS_IMAGE = None  # Prebuilt image with the lint/test/security tools (None: install per pipeline)
+YML_PYTEST_WORKERS = None  # pytest-xdist worker count ("auto" or an int); None runs pytest serially
+YML_TOOL_PACKAGES = {  # pip packages installed by the prepare job for each selected tool
+    "pytest": ["pytest", "pytest-cov", "pytest-html"],
+    "pylint": ["pylint"],
+    "flake8": ["flake8"],
+    "mypy": ["mypy"],
+    "bandit": ["bandit"],
+    "safety": ["safety"]
+}
+
+# PDF reports
+PDF_STREAM_CHUNK_SIZE = 64 * 1024  # Bytes per chunk when streaming a report
+PDF_MAX_PIPELINES = 20  # Pipelines allowed in one multi-pipeline report
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Rendered reports kept in memory, in bytes
+PDF_CACHE_MAX_ENTRIES = 512  # Rendered reports kept in memory
+PDF_REPORT_INDEX_TTL = 300  # Seconds a download reuses its last analysis without S3/Bedrock
+
+# Bulk project provisioning
+BULK_DEFAULT_WORKERS = 4  # Concurrent projects provisioned per batch
+BULK_MAX_WORKERS = 16  # Upper bound on requested workers
+BULK_MAX_PROJECTS = 100  # Max project specs per batch request
+
+# Provisioning progress stream (Server-Sent Events)
+PROVISION_WATCH_INTERVAL = 5  # Seconds between GitLab pipeline status polls, before backing off
+PROVISION_WATCH_MAX_INTERVAL = 30  # Polls back off (doubling) to this while the status is unchanged
+PROVISION_WATCH_TIMEOUT = 300  # Default seconds a stream follows a pipeline before closing
+PROVISION_WATCH_MAX_TIMEOUT = 900  # Upper bound on a requested watch_timeout
+PIPELINE_FINAL_STATUSES = {"success", "failed", "canceled", "skipped", "manual"}
+
+# Serving (production: gunicorn -c gunicorn.conf.py wsgi:application)
+WORKER_PROCESSES = 1  # Server processes splitting the GitLab/Bedrock budgets (set by gunicorn.conf.py)
+SHUTDOWN_DRAIN_TIMEOUT = 60  # Seconds queued/running analysis jobs get to finish on shutdown
+DEV_SERVER_HOST = "0.0.0.0"
+DEV_SERVER_PORT = 5000
+DEV_SERVER_DEBUG = True  # python app.py only; never used by the WSGI entry point
+
+# Any str/int/float/bool setting above can be overridden with ONEDEV_<NAME>;
+# None-default (optional) settings take the value as a string
+ENV_PREFIX = "ONEDEV_"
+
+def env_overrides(settings, environ=os.environ, prefix=ENV_PREFIX):
+    """Typed overrides for module settings from ONEDEV_<NAME> environment variables"""
+    overrides = {}
+    for name, default in settings.items():
+        raw = environ.get(prefix + name)
+        if raw is None or not name.isupper():
+            continue
+        try:
+            if isinstance(default, bool):
+                if raw.strip().lower() not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+                    raise ValueError(raw)
+                overrides[name] = raw.strip().lower() in ("1", "true", "yes", "on")
+            elif isinstance(default, (int, float)):
+                overrides[name] = type(default)(raw)
+            elif isinstance(default, str) or default is None:
+                # Optional (None) settings are strings too: a path or "auto"/"4" stays as given
+                overrides[name] = raw
+        except ValueError:
+            raise ValueError(f"{prefix}{name}={raw!r}: expected {type(default).__name__}") from None
+    return overrides
+
+globals().update(env_overrides(dict(globals())))
+WORKER_PROCESSES = max(1, WORKER_PROCESSES)
+if WORKER_PROCESSES > min(GITLAB_RATE_BURST, BEDROCK_RATE_BURST, BEDROCK_MAX_CONCURRENCY):
+    # Each process needs a whole token and a whole slot: more processes would overrun the global budgets
+    raise ValueError(
+        f"{ENV_PREFIX}WORKER_PROCESSES={WORKER_PROCESSES} exceeds the smallest global budget "
+        f"(GITLAB_RATE_BURST, BEDROCK_RATE_BURST, BEDROCK_MAX_CONCURRENCY); raise those or run fewer workers"
+    )
+if ANALYSIS_MODE not in ANALYSIS_MODES:
+    raise ValueError(f"{ENV_PREFIX}ANALYSIS_MODE must be one of {', '.join(ANALYSIS_MODES)}")
+
+request_id_var = contextvars.ContextVar("request_id", default="-")
+logger = logging.getLogger("onedev")
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every record with the correlation ID of the request being served"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class StructuredFormatter(logging.Formatter):
+    """key=value lines, or one JSON object per line when style is "json"
+
+    Fields passed with extra={...} are emitted next to the message.
+    """
+
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "taskName"}
+
+    def __init__(self, style="text"):
+        super().__init__()
+        self.style = style
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in self.RESERVED}
+        request_id = getattr(record, "request_id", "-")
+        if self.style == "json":
+            payload = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "request_id": request_id,
+                "message": record.getMessage()
+            }
+            payload.update(fields)
+            return json.dumps(payload, default=str)
+        line = f"{self.formatTime(record)} {record.levelname} [{request_id}] {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, default=str)}" for key, value in fields.items())
+        return line
 
-print(f"OneDev API started - CORRECT PARAMETERS")
-print(f"GitLab URL: {GITLAB_BASE_URL}")
-print(f"TechopsOneDev Group: {ONEDEV_GROUP_NAME} (ID: {ONEDEV_GROUP_ID})")
-print(f"Group URL: {GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}")
-print(f"S3 Bucket: {S3_BUCKET_NAME}")
-
-# AWS Clients
-try:
-    bedrock = boto3.client('bedrock-runtime', region_name=AWS_REGION)
-    s3_client = boto3.client('s3', region_name=AWS_REGION)
-    print("AWS Bedrock + S3 connected")
-except Exception as e:
-    bedrock = None
-    s3_client = None
-    print(f"AWS Bedrock/S3 not available: {e}")
+log_listener = None
+
+def configure_logging(level=LOG_LEVEL, style=LOG_FORMAT):
+    """Send the onedev logger through a queue: request threads only enqueue, one thread writes stdout"""
+    global log_listener
+    if log_listener is not None:
+        # Reconfiguring: flush and retire the previous writer thread
+        atexit.unregister(log_listener.stop)
+        log_listener.stop()
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(style))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.handlers[:] = [queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    log_listener = listener
+    return listener
+
+configure_logging()
+
+@app.before_request
+def assign_request_id():
+    incoming = request.headers.get("X-Request-ID", "")
+    request_id_var.set(incoming if REQUEST_ID_PATTERN.fullmatch(incoming) else uuid.uuid4().hex[:16])
+    g.request_started = time.monotonic()
+
+@app.after_request
+def log_request(response):
+    response.headers["X-Request-ID"] = request_id_var.get()
+    started = g.get("request_started")
+    elapsed = time.monotonic() - started if started else None
+    # The URL rule, not the path, so project and job IDs do not become label values
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.inc("onedev_http_requests_total", method=request.method, route=route, status=response.status_code)
+    if elapsed is not None:
+        metrics.observe("onedev_http_request_duration_seconds", elapsed, method=request.method, route=route)
+    # Load balancers poll /api/health constantly: keep those lines out of INFO
+    log = logger.debug if request.path == "/api/health" else logger.info
+    log(
+        "%s %s %s", request.method, request.path, response.status_code,
+        extra={"duration_ms": round(elapsed * 1000, 1) if elapsed is not None else None}
+    )
+    return response
+
+def in_current_context(func):
+    """Wrap func to run in a copy of the caller's context (keeps the request ID in worker threads)"""
+    context = contextvars.copy_context()
+    # A Context cannot be entered by two threads at once: run each call in its own copy
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+class MetricsRegistry:
+    """Thread-safe latency histograms and counters, rendered in Prometheus text format
+
+    Label values must stay low-cardinality: route rules and upstream
+    operation names, never raw paths or IDs.
+    """
+
+    HELP = {
+        "onedev_http_request_duration_seconds": ("histogram", "Time to build the response, per route"),
+        "onedev_http_requests_total": ("counter", "Responses per route and status code"),
+        "onedev_upstream_request_duration_seconds": ("histogram", "Upstream call latency, retries and throttling included"),
+        "onedev_upstream_requests_total": ("counter", "Upstream calls per dependency and operation"),
+        "onedev_upstream_errors_total": ("counter", "Upstream calls that raised or returned an HTTP error status")
+    }
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, seconds, **labels):
+        """Add one observation to a histogram (per-bucket counts, made cumulative on render)"""
+        key = self._key(name, labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["buckets"][index] += 1
+            series["sum"] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def record_upstream(self, upstream, operation, seconds, error=False):
+        self.observe("onedev_upstream_request_duration_seconds", seconds, upstream=upstream, operation=operation)
+        self.inc("onedev_upstream_requests_total", upstream=upstream, operation=operation)
+        if error:
+            self.inc("onedev_upstream_errors_total", upstream=upstream, operation=operation)
+
+    @contextmanager
+    def track_upstream(self, upstream, operation):
+        """Time the enclosed upstream call; an exception counts as an error"""
+        started = time.monotonic()
+        error = False
+        try:
+            yield
+        except Exception:
+            # GeneratorExit (an abandoned stream) is not an upstream error
+            error = True
+            raise
+        finally:
+            self.record_upstream(upstream, operation, time.monotonic() - started, error)
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        escaped = (
+            (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for key, value in labels
+        )
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+    @staticmethod
+    def _value(value):
+        return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+    def render(self, gauges=()):
+        """Prometheus exposition text; gauges are (name, type, help, [(labels, value), ...]) sampled by the caller"""
+        with self._lock:
+            histograms = {key: (list(series["buckets"]), series["sum"]) for key, series in self._histograms.items()}
+            counters = dict(self._counters)
+
+        families = OrderedDict()
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, []).append(f"{name}{self._labels(labels)} {self._value(value)}")
+        for (name, labels), (buckets, total) in sorted(histograms.items()):
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{self._labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {total!r}")
+            lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+
+        output = []
+        for name, lines in families.items():
+            kind, help_text = self.HELP.get(name, ("untyped", name))
+            output.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+            output.extend(lines)
+        for name, kind, help_text, samples in gauges:
+            output.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+            output.extend(
+                f"{name}{self._labels(tuple(sorted(labels.items())))} {self._value(value)}"
+                for labels, value in samples
+            )
+        return "\n".join(output) + "\n"
+
+metrics = MetricsRegistry()
+
+def gitlab_operation(url):
+    """Low-cardinality operation label for a GitLab API URL (IDs dropped)"""
+    parts = urlsplit(url).path.split("/api/v4/", 1)[-1].strip("/").split("/")
+    if parts[0] == "projects" and len(parts) > 2:
+        if "commits" in parts:
+            return "commits"
+        if parts[2].startswith("pipeline"):
+            return "pipeline"
+    return parts[0] or "other"
+
+logger.info(
+    "OneDev API started",
+    extra={
+        "gitlab_url": GITLAB_BASE_URL,
+        "group": ONEDEV_GROUP_NAME,
+        "group_id": ONEDEV_GROUP_ID,
+        "group_url": f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}",
+        "s3_bucket": S3_BUCKET_NAME
+    }
+)
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every caller"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; return False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.acquired += 1
+                    if waited:
+                        self.throttled += 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if deadline is not None and now + delay > deadline:
+                return False
+            waited = True
+            time.sleep(delay)
+            with self._lock:
+                self.waited_seconds += delay
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.capacity,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited_seconds, 3)
+            }
+
+class GitLabSession:
+    """Shared keep-alive connection pool to GitLab with bounded retries
+
+    A single instance is reused across Flask requests and tokens: the
+    Authorization header is passed per call, never stored on the session.
+    """
+
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    RETRY_STATUSES = {429, 502, 503, 504}
+
+    def __init__(self, pool_size=GITLAB_POOL_SIZE, max_retries=GITLAB_MAX_RETRIES,
+                 backoff_factor=GITLAB_BACKOFF_FACTOR, max_retry_after=GITLAB_MAX_RETRY_AFTER,
+                 rate_limiter=None):
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_after = max_retry_after
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the pool, recording its latency per GitLab operation"""
+        method = method.upper()
+        operation = gitlab_operation(url)
+        started = time.monotonic()
+        try:
+            response = self._send(method, url, **kwargs)
+        except Exception:
+            metrics.record_upstream("gitlab", operation, time.monotonic() - started, error=True)
+            raise
+        metrics.record_upstream("gitlab", operation, time.monotonic() - started, error=response.status_code >= 400)
+        return response
+
+    def _send(self, method, url, **kwargs):
+        """Send one logical request, retrying transient failures"""
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            with self._lock:
+                self._requests += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
+                # A POST may have reached GitLab unless the connect itself timed out
+                retryable = method in self.IDEMPOTENT_METHODS or isinstance(e, requests.exceptions.ConnectTimeout)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                # 429 means GitLab did not process the request, so every method is safe to retry
+                retryable = response.status_code == 429 or (
+                    response.status_code in self.RETRY_STATUSES and method in self.IDEMPOTENT_METHODS
+                )
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                response.close()
+
+            attempt += 1
+            with self._lock:
+                self._retries += 1
+            logger.warning("GitLab %s %s retry %d/%d in %.1fs", method, url, attempt, self.max_retries, delay)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _backoff(self, attempt):
+        return self.backoff_factor * (2 ** attempt)
+
+    def _retry_after(self, response):
+        """Parse a Retry-After header (seconds or HTTP date), capped"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+                delay = (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0.0), self.max_retry_after)
+
+    def stats(self):
+        """Connection pool counters: a hit reuses a kept-alive connection, a miss opens a new one"""
+        opened = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            pooled_requests += pool.num_requests
+        with self._lock:
+            total, retries = self._requests, self._retries
+        stats = {
+            "requests": total,
+            "retries": retries,
+            "pool_size": self.pool_size,
+            "pool_hits": max(pooled_requests - opened, 0),
+            "pool_misses": opened
+        }
+        if self.rate_limiter:
+            stats["rate_limit"] = self.rate_limiter.stats()
+        return stats
+
+class BedrockUnavailableError(Exception):
+    """Raised without calling Bedrock: circuit open or no slot within the queue timeout"""
+
+class _SlotReleasingStream:
+    """Response stream that gives its concurrency slot back when closed"""
+
+    def __init__(self, events, release):
+        self._events = events
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def close(self):
+        try:
+            self._events.close()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+class BedrockGateway:
+    """Shared front for the Bedrock runtime client
+
+    Every invocation takes a token from a global bucket and one of
+    max_concurrency slots (waiting at most queue_timeout), throttling and
+    transient errors are retried with full-jitter backoff, and after
+    breaker_threshold consecutive failures the circuit opens: calls fail
+    fast with BedrockUnavailableError until a trial call succeeds after
+    breaker_cooldown. invoke_model and invoke_model_with_response_stream
+    keep the client's signatures so the gateway stands in for it.
+    """
+
+    RETRY_ERROR_CODES = {
+        "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+        "ModelNotReadyException", "InternalServerException", "ModelTimeoutException"
+    }
+    RETRY_BOTOCORE_ERRORS = ("EndpointConnectionError", "ConnectTimeoutError", "ReadTimeoutError", "ConnectionClosedError")
+
+    def __init__(self, client, rate_limiter=None, max_concurrency=BEDROCK_MAX_CONCURRENCY,
+                 queue_timeout=BEDROCK_QUEUE_TIMEOUT, max_retries=BEDROCK_MAX_RETRIES,
+                 backoff_base=BEDROCK_BACKOFF_BASE, backoff_cap=BEDROCK_BACKOFF_CAP,
+                 breaker_threshold=BEDROCK_BREAKER_THRESHOLD, breaker_cooldown=BEDROCK_BREAKER_COOLDOWN):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._queued = 0
+        self._in_flight = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.rejected = 0
+        self.breaker_opened = 0
+        # botocore is only loaded once a client exists, so its exceptions are resolved here
+        from botocore.exceptions import BotoCoreError, ClientError
+        self._client_error = ClientError
+        self._boto_errors = (ClientError, BotoCoreError)
+
+    def invoke_model(self, **kwargs):
+        return self._call(self.client.invoke_model, kwargs, stream=False)
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        return self._call(self.client.invoke_model_with_response_stream, kwargs, stream=True)
+
+    def _call(self, method, kwargs, stream):
+        attempt = 0
+        while True:
+            self._admit()
+            self._acquire_slot()
+            try:
+                response = method(**kwargs)
+            except self._boto_errors as e:
+                self._release_slot()
+                retryable = self._is_retryable(e)
+                if not retryable and isinstance(e, self._client_error):
+                    # Bedrock answered (bad request, access denied...): it is up
+                    self._record(healthy=True)
+                    raise
+                with self._lock:
+                    give_up = not retryable or attempt >= self.max_retries or self._state != "closed"
+                if give_up:
+                    self._record(healthy=False)
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                logger.warning("Bedrock %s (%s), retry %d/%d in %.2fs", type(e).__name__, self._error_code(e), attempt, self.max_retries, delay)
+                time.sleep(delay)
+                continue
+            except Exception:
+                self._release_slot()
+                self._record(healthy=False)
+                raise
+            
+            self._record(healthy=True)
+            if stream:
+                response['body'] = _SlotReleasingStream(response['body'], self._release_slot)
+            else:
+                self._release_slot()
+            return response
+
+    def _admit(self):
+        """Circuit breaker check: fail fast while open, let one trial call through after the cooldown"""
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.breaker_cooldown:
+                    self.rejected += 1
+                    raise BedrockUnavailableError("Bedrock circuit open, failing fast")
+                self._state = "half_open"
+            if self._state == "half_open":
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    raise BedrockUnavailableError("Bedrock circuit half-open, trial call in progress")
+                self._trial_in_flight = True
+
+    def _record(self, healthy):
+        with self._lock:
+            self._trial_in_flight = False
+            if healthy:
+                self._consecutive_failures = 0
+                self._state = "closed"
+                return
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._state == "half_open" or self._consecutive_failures >= self.breaker_threshold:
+                if self._state != "open":
+                    self.breaker_opened += 1
+                    logger.error("Bedrock circuit opened after %d consecutive failures", self._consecutive_failures)
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def _acquire_slot(self):
+        deadline = time.monotonic() + self.queue_timeout
+        with self._lock:
+            self._queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queued)
+        try:
+            admitted = (
+                (self.rate_limiter is None or self.rate_limiter.acquire(timeout=self.queue_timeout))
+                and self._slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+            )
+        finally:
+            with self._lock:
+                self._queued -= 1
+        if not admitted:
+            with self._lock:
+                self.rejected += 1
+                self._trial_in_flight = False
+            raise BedrockUnavailableError(f"No Bedrock slot within {self.queue_timeout}s")
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _error_code(self, error):
+        if isinstance(error, self._client_error):
+            return error.response.get("Error", {}).get("Code", "")
+        return type(error).__name__
+
+    def _is_retryable(self, error):
+        code = self._error_code(error)
+        if code in ("ThrottlingException", "TooManyRequestsException"):
+            with self._lock:
+                self.throttled += 1
+        return code in self.RETRY_ERROR_CODES or code in self.RETRY_BOTOCORE_ERRORS
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "breaker_opened": self.breaker_opened,
+                "queue_depth": self._queued,
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency
+            }
+        if self.rate_limiter:
+            stats["rate_limit"] = self.rate_limiter.stats()
+        return stats
+
+class TTLCache:
+    """Thread-safe in-process LRU cache with per-entry expiry and hit/miss stats"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def hash_token(token):
+    """Cache key for a GitLab token (the raw token is never kept in memory caches)"""
+    return hashlib.sha256((token or "").encode('utf-8')).hexdigest()
+
+class AnalysisCache:
+    """Content-addressed cache of Bedrock analyses
+    
+    Entries live in an in-memory TTLCache and, when a directory is given, in
+    JSON files that survive restarts. Values are deep-copied in and out so
+    callers can annotate the returned dict freely.
+    """
+
+    def __init__(self, maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL,
+                 directory=ANALYSIS_CACHE_DIR, disk_max_entries=ANALYSIS_CACHE_DISK_MAX_ENTRIES):
+        self.memory = TTLCache(maxsize, ttl)
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_max_entries = disk_max_entries
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.directory:
+            value = self._disk_get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        self.memory.set(key, value)
+        if self.directory:
+            self._disk_set(key, value)
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return value
+
+    def _disk_set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Analysis cache write failed: %s", e)
+            return
+        with self._lock:
+            self.disk_writes += 1
+            if self.disk_writes % 100 == 0:
+                self._disk_evict()
+
+    def _disk_evict(self):
+        """Drop the oldest files once the directory holds too many entries"""
+        try:
+            entries = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory) if name.endswith('.json')
+            ]
+            if len(entries) <= self.disk_max_entries:
+                return
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:len(entries) - self.disk_max_entries]:
+                os.remove(path)
+        except OSError as e:
+            logger.warning("Analysis cache eviction failed: %s", e)
+
+    def stats(self):
+        stats = self.memory.stats()
+        with self._lock:
+            stats["disk"] = {
+                "enabled": bool(self.directory),
+                "hits": self.disk_hits,
+                "writes": self.disk_writes
+            }
+        return stats
+
+class ReportCache:
+    """LRU cache of rendered reports bounded by entry count and total bytes"""
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES, max_entries=PDF_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._data[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes or len(self._data) > self.max_entries:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Shared GitLab connection pool
+# Rate limits are global budgets: each server process gets its share
+gitlab_http = GitLabSession(rate_limiter=RateLimiter(
+    GITLAB_RATE_LIMIT / WORKER_PROCESSES, GITLAB_RATE_BURST // WORKER_PROCESSES
+))
+
+# Token validation and group access caches, keyed by token hash
+gitlab_user_cache = TTLCache(GITLAB_AUTH_CACHE_SIZE, GITLAB_TOKEN_CACHE_TTL)
+gitlab_group_cache = TTLCache(GITLAB_AUTH_CACHE_SIZE, GITLAB_GROUP_CACHE_TTL)
 
 class GitLabService:
     def __init__(self, token):
         self.token = token
+        self.token_hash = hash_token(token)
         self.headers = {"Authorization": f"Bearer {token}"}
     
+    def _check_auth(self, response):
+        """Drop cached validation/group access for this token when GitLab rejects it"""
+        if response.status_code in (401, 403):
+            gitlab_user_cache.invalidate(self.token_hash)
+            gitlab_group_cache.invalidate((self.token_hash, ONEDEV_GROUP_ID))
+    
     def validate_token(self):
         """Validate GitLab token and get user info"""
+        cached_user = gitlab_user_cache.get(self.token_hash)
+        if cached_user is not None:
+            return dict(cached_user)
+        
         try:
-            print(f"🔍 DEBUG - Testing GitLab token...")
-            response = requests.get(
+            response = gitlab_http.get(
                 f"{GITLAB_BASE_URL}/api/v4/user",
                 headers=self.headers,
                 timeout=10
             )
-            print(f"🔍 DEBUG - Token validation response: {response.status_code}")
+            logger.debug("GitLab token validation response", extra={"status": response.status_code})
+            self._check_auth(response)
             response.raise_for_status()
             user_data = response.json()
-            print(f"🔍 DEBUG - User: {user_data.get('username')} ({user_data.get('name')})")
-            return user_data
+            logger.debug("GitLab token valid", extra={"username": user_data.get('username')})
+            gitlab_user_cache.set(self.token_hash, user_data)
+            return dict(user_data)
         except Exception as e:
-            print(f"❌ GitLab token validation failed: {e}")
+            logger.warning("GitLab token validation failed, using demo user: %s", e)
             # Demo mode if GitLab unavailable
             return {
                 "name": "GitLab Developer",
@@ -82,38 +1078,36 @@ class GitLabService:
     
     def verify_group_access(self):
         """Verify access to TechopsOneDev group"""
+        cache_key = (self.token_hash, ONEDEV_GROUP_ID)
+        if gitlab_group_cache.get(cache_key):
+            return True
+        
         try:
-            print(f"\n🔍 DEBUG - Verifying group access...")
-            print(f"   Group: {ONEDEV_GROUP_NAME} (ID: {ONEDEV_GROUP_ID})")
-            print(f"   URL: {GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}")
-            
-            response = requests.get(
+            response = gitlab_http.get(
                 f"{GITLAB_BASE_URL}/api/v4/groups/{ONEDEV_GROUP_ID}",
                 headers=self.headers,
                 timeout=10
             )
             
-            print(f"🔍 DEBUG - Group access response: {response.status_code}")
+            self._check_auth(response)
             
             if response.status_code == 200:
                 group_data = response.json()
-                print(f"✅ Group access confirmed!")
-                print(f"   Name: {group_data.get('name')}")
-                print(f"   Path: {group_data.get('path')}")
-                print(f"   URL: {group_data.get('web_url')}")
+                logger.debug("Group access confirmed", extra={"group": group_data.get('path'), "group_url": group_data.get('web_url')})
+                gitlab_group_cache.set(cache_key, True)
                 return True
             elif response.status_code == 404:
-                print(f"❌ Group not found with ID {ONEDEV_GROUP_ID}")
+                logger.warning("Group not found", extra={"group_id": ONEDEV_GROUP_ID})
                 return False
             elif response.status_code == 403:
-                print(f"❌ Access denied to group {ONEDEV_GROUP_NAME}")
+                logger.warning("Access denied to group", extra={"group": ONEDEV_GROUP_NAME})
                 return False
             else:
-                print(f"❌ Unknown error: {response.status_code}")
+                logger.warning("Unexpected group access response", extra={"status": response.status_code})
                 return False
                 
         except Exception as e:
-            print(f"❌ Error verifying group access: {e}")
+            logger.error("Error verifying group access: %s", e)
             return False
     
     def create_project_only(self, name, branch="main"):
@@ -121,7 +1115,7 @@ class GitLabService:
         
         # Vérifier l'accès au groupe d'abord
         if not self.verify_group_access():
-            print(f"⚠️  Group access verification failed, using demo mode")
+            logger.warning("Group access verification failed, using demo mode")
         
         try:
             data = {
@@ -132,46 +1126,37 @@ class GitLabService:
                 "default_branch": branch
             }
             
-            print(f"\n🔍 DEBUG - GitLab Project Creation Attempt:")
-            print(f"   URL: {GITLAB_BASE_URL}/api/v4/projects")
-            print(f"   Target Group: {ONEDEV_GROUP_NAME} (ID: {ONEDEV_GROUP_ID})")
-            print(f"   Project Name: {name}")
-            print(f"   Expected URL: {GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{name}")
-            print(f"   Data: {json.dumps(data, indent=4)}")
+            # The payload is only serialized by the log writer, and only when DEBUG is enabled
+            logger.debug("GitLab project creation request", extra={"project": name, "payload": data})
             
-            response = requests.post(
+            response = gitlab_http.post(
                 f"{GITLAB_BASE_URL}/api/v4/projects",
                 headers=self.headers,
                 json=data,
                 timeout=30
             )
             
-            print(f"\n🔍 DEBUG - GitLab API Response:")
-            print(f"   Status Code: {response.status_code}")
-            print(f"   Response Content (first 1000 chars):")
-            print(f"     {response.text[:1000]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "GitLab project creation response",
+                    extra={"status": response.status_code, "body": response.text[:LOG_DEBUG_BODY_CHARS]}
+                )
             
             if response.status_code == 201:
-                print(f"✅ SUCCESS - Project created successfully!")
                 project_data = response.json()
-                print(f"   Project ID: {project_data.get('id')}")
-                print(f"   GitLab returned URL: {project_data.get('web_url')}")
                 
                 # 🚨 CONSTRUCTION FIABLE DE L'URL avec les bons paramètres
                 correct_url = f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{name}"
                 correct_ssh = f"git@gitlab.com:{ONEDEV_GROUP_NAME}/{name}.git"
                 
-                print(f"   Our correct URL: {correct_url}")
-                print(f"   SSH URL: {correct_ssh}")
-                
                 # Vérifier que l'URL GitLab contient les bons éléments
                 gitlab_url = project_data.get('web_url', '')
                 if ONEDEV_GROUP_NAME in gitlab_url and name in gitlab_url:
-                    print(f"   ✅ URL verification passed - GitLab URL is correct")
                     final_url = gitlab_url  # Utiliser l'URL GitLab si elle est correcte
                 else:
-                    print(f"   ⚠️  URL mismatch - using our constructed URL")
+                    logger.warning("GitLab project URL mismatch, using constructed URL", extra={"gitlab_url": gitlab_url, "url": correct_url})
                     final_url = correct_url  # Utiliser notre URL construite
+                logger.info("GitLab project created", extra={"project": name, "project_id": project_data.get('id'), "url": final_url})
                 
                 # Enrichir les données du projet
                 project_data['web_url_fixed'] = final_url
@@ -182,38 +1167,38 @@ class GitLabService:
                 return project_data
                 
             else:
-                print(f"❌ FAILED - HTTP {response.status_code}")
+                self._check_auth(response)
                 
                 # Try to parse error message
+                hint = None
                 try:
                     error_data = response.json()
-                    print(f"   Error Details: {json.dumps(error_data, indent=4)}")
                     
                     # Analyser les erreurs courantes
                     if 'name' in error_data.get('message', {}):
-                        print(f"   💡 Possible cause: Project name already exists or invalid")
+                        hint = "Project name already exists or invalid"
                     if response.status_code == 403:
-                        print(f"   💡 Possible cause: No permission to create projects in this group")
+                        hint = "No permission to create projects in this group"
                     if response.status_code == 404:
-                        print(f"   💡 Possible cause: Group {ONEDEV_GROUP_ID} not found")
+                        hint = f"Group {ONEDEV_GROUP_ID} not found"
                         
                 except:
-                    print(f"   Raw Error: {response.text}")
+                    error_data = response.text[:LOG_DEBUG_BODY_CHARS]
+                logger.error(
+                    "GitLab project creation failed",
+                    extra={"project": name, "status": response.status_code, "error": error_data, "hint": hint}
+                )
                 
                 # Raise HTTP error to be caught below
                 response.raise_for_status()
             
         except requests.exceptions.HTTPError as http_err:
-            print(f"\n❌ HTTP ERROR in project creation:")
-            print(f"   Status Code: {http_err.response.status_code}")
-            print(f"   Reason: {http_err.response.reason}")
-            print(f"   URL: {http_err.response.url}")
-            print(f"   Response Text: {http_err.response.text}")
-            
             # Return demo data with CORRECT parameters
-            print(f"🔄 Returning demo data with CORRECT group parameters...")
             demo_url = f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{name}"
-            print(f"   Demo URL: {demo_url}")
+            logger.warning(
+                "HTTP error in project creation, returning demo data",
+                extra={"status": http_err.response.status_code, "reason": http_err.response.reason, "demo_url": demo_url}
+            )
             
             return {
                 "id": 12345,
@@ -229,9 +1214,7 @@ class GitLabService:
             }
             
         except requests.exceptions.RequestException as req_err:
-            print(f"\n❌ REQUEST ERROR in project creation:")
-            print(f"   Error: {req_err}")
-            print(f"   Type: {type(req_err)}")
+            logger.warning("Request error in project creation, returning demo data: %r", req_err)
             
             # Return demo data
             demo_url = f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{name}"
@@ -249,9 +1232,7 @@ class GitLabService:
             }
             
         except Exception as e:
-            print(f"\n❌ GENERAL ERROR in project creation:")
-            print(f"   Error: {e}")
-            print(f"   Type: {type(e)}")
+            logger.exception("Error in project creation, returning demo data")
             
             # Return demo data
             demo_url = f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{name}"
@@ -285,24 +1266,22 @@ class GitLabService:
                 "actions": actions
             }
             
-            print(f"\n🔍 DEBUG - GitLab Commit Files:")
-            print(f"   URL: {GITLAB_BASE_URL}/api/v4/projects/{project_id}/repository/commits")
-            print(f"   Files: {list(files.keys())}")
-            print(f"   Commit Message: {commit_message}")
+            logger.debug("GitLab commit request", extra={"project_id": project_id, "files": list(files), "commit_message": commit_message})
             
-            response = requests.post(
+            response = gitlab_http.post(
                 f"{GITLAB_BASE_URL}/api/v4/projects/{project_id}/repository/commits",
                 headers=self.headers,
                 json=data,
                 timeout=30
             )
             
-            print(f"🔍 DEBUG - Commit Response: {response.status_code}")
+            logger.debug("GitLab commit response", extra={"status": response.status_code})
+            self._check_auth(response)
             
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"❌ GitLab multiple files commit failed: {e}")
+            logger.warning("GitLab multiple files commit failed, returning demo commit: %s", e)
             return {"id": "abc123", "message": commit_message}
     
     def trigger_pipeline(self, project_id, branch="main"):
@@ -310,162 +1289,1184 @@ class GitLabService:
         try:
             data = {"ref": branch}
             
-            print(f"\n🔍 DEBUG - GitLab Trigger Pipeline:")
-            print(f"   URL: {GITLAB_BASE_URL}/api/v4/projects/{project_id}/pipeline")
-            print(f"   Branch: {branch}")
+            logger.debug("GitLab pipeline trigger request", extra={"project_id": project_id, "branch": branch})
             
-            response = requests.post(
+            response = gitlab_http.post(
                 f"{GITLAB_BASE_URL}/api/v4/projects/{project_id}/pipeline",
                 headers=self.headers,
                 json=data,
                 timeout=30
             )
             
-            print(f"🔍 DEBUG - Pipeline Response: {response.status_code}")
+            logger.debug("GitLab pipeline trigger response", extra={"status": response.status_code})
+            self._check_auth(response)
             
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"❌ GitLab pipeline trigger failed: {e}")
+            logger.warning("GitLab pipeline trigger failed, returning demo pipeline: %s", e)
             return {"id": 67890, "status": "running"}
+    
+    def get_pipeline(self, project_id, pipeline_id):
+        """Get a pipeline's current status (None if GitLab cannot be reached)"""
+        try:
+            response = gitlab_http.get(
+                f"{GITLAB_BASE_URL}/api/v4/projects/{project_id}/pipelines/{pipeline_id}",
+                headers=self.headers,
+                timeout=10
+            )
+            self._check_auth(response)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.warning("GitLab pipeline status failed: %s", e)
+            return None
+
+def log_excerpt(content, head=LOG_HEAD_CHARS, tail=LOG_TAIL_CHARS):
+    """Keep the start and the end of a log, where setup context and errors sit"""
+    if len(content) <= head + tail + len(LOG_TRUNCATION_MARKER):
+        return content
+    return content[:head] + LOG_TRUNCATION_MARKER + content[-tail:]
+
+LOG_NOISE_PATTERN = re.compile(
+    r"^(Starting .*\.\.\.|Running .*\.\.\.|(Pipeline ID|Project|Commit|Timestamp|Group): |---$)"  # Generated job headers
+    r"|\sPASSED\b|\.\.\. ok$"  # Passing tests
+    r"|^\s*(\"[^\"]*\"\s*:|[\[\]{}],?$)"  # JSON reports copied into the log
+)
+LOG_SIGNAL_PATTERN = re.compile(
+    r"error|fail|warn|exception|traceback|critical|fatal|vulnerab|denied|timed? ?out|\b[EFW]\d{3,4}\b",
+    re.IGNORECASE
+)
+PYTEST_SUMMARY_PATTERN = re.compile(r"^=+ (.*\b(?:passed|failed|error|errors)\b.*) in [\d.]+s")
+UNITTEST_RAN_PATTERN = re.compile(r"^Ran (\d+) tests? in")
+UNITTEST_FAILED_PATTERN = re.compile(r"^FAILED \((.*)\)")
+
+def _clip(text):
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= PREFILTER_MESSAGE_CHARS else text[:PREFILTER_MESSAGE_CHARS] + "..."
+
+class ArtifactRecord:
+    """Base for compact typed records parsed from report artifacts"""
+    __slots__ = ()
+    
+    def __init__(self, *values):
+        for slot, value in zip(self.__slots__, values):
+            setattr(self, slot, value)
+    
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class TestCaseRecord(ArtifactRecord):
+    """Failed or errored test case from a junit report"""
+    __slots__ = ("classname", "name", "outcome", "message")
+    
+    def line(self):
+        return f"{self.outcome.upper()} {self.classname}::{self.name}: {self.message}"
+
+class LintMessageRecord(ArtifactRecord):
+    """One pylint message"""
+    __slots__ = ("path", "line_number", "code", "symbol", "severity", "message")
+    
+    def line(self):
+        return f"{self.path}:{self.line_number} {self.code} {self.symbol}: {self.message}"
+
+class SecurityIssueRecord(ArtifactRecord):
+    """One bandit issue (or scan error when test_id is None)"""
+    __slots__ = ("path", "line_number", "test_id", "severity", "confidence", "text")
+    
+    def line(self):
+        if self.test_id is None:
+            return f"ERROR {self.path}: {self.text}"
+        return f"{self.path}:{self.line_number} {self.test_id} [{self.severity}/{self.confidence}]: {self.text}"
+
+class VulnerabilityRecord(ArtifactRecord):
+    """One vulnerable dependency reported by safety"""
+    __slots__ = ("package", "version", "vulnerability_id", "advisory")
+    
+    def line(self):
+        return f"{self.package} {self.version} {self.vulnerability_id}: {self.advisory}"
+
+class CoverageRecord(ArtifactRecord):
+    """Line coverage of one source file"""
+    __slots__ = ("filename", "lines_valid", "lines_covered")
+    
+    @property
+    def percent(self):
+        return round(100.0 * self.lines_covered / self.lines_valid, 1) if self.lines_valid else 100.0
+    
+    def line(self):
+        return f"{self.filename}: {self.percent}% ({self.lines_covered}/{self.lines_valid} lines)"
+
+class ArtifactReport:
+    """A parsed report artifact: counts, one-line summary and typed records"""
+    __slots__ = ("file_name", "counts", "summary", "records", "records_total")
+    
+    def __init__(self, file_name, counts, summary, records, records_total=None):
+        self.file_name = file_name
+        self.counts = counts
+        self.summary = summary
+        self.records = records[:ARTIFACT_MAX_RECORDS]
+        self.records_total = len(records) if records_total is None else records_total
+    
+    def finding_lines(self, limit=PREFILTER_MAX_LINES):
+        lines = [record.line() for record in self.records[:limit]]
+        if self.records_total > limit:
+            lines.append(f"... {self.records_total - limit} more")
+        return lines
+    
+    def to_dict(self, max_records=PREFILTER_MAX_LINES):
+        return {
+            "summary": self.summary,
+            "counts": self.counts,
+            "records": [record.to_dict() for record in self.records[:max_records]],
+            "records_total": self.records_total
+        }
+
+def _severity_summary(counts, empty):
+    return ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items())) or empty
+
+def _read_json_report(stream, file_name):
+    """Load a JSON report, refusing one over S3_LOG_MAX_BYTES rather than parsing a truncated body"""
+    raw = stream.read(S3_LOG_MAX_BYTES + 1)
+    if len(raw) > S3_LOG_MAX_BYTES:
+        raise ValueError(f"{file_name} exceeds the {S3_LOG_MAX_BYTES} byte report limit; not parsed")
+    return json.loads(raw or b"null")
+
+def parse_junit_xml(stream):
+    """Stream-parse a pytest junit XML report (one testcase in memory at a time)"""
+    counts = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+    failed = []
+    parents = []  # Open elements; a finished testcase is detached from parents[-1]
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag == "testcase":
+            for outcome in ("failure", "error"):
+                node = elem.find(outcome)
+                if node is not None:
+                    message = node.get("message") or ((node.text or "").strip().splitlines() or [""])[-1]
+                    failed.append(TestCaseRecord(elem.get("classname"), elem.get("name"), outcome, _clip(message)))
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+        elif elem.tag == "testsuite":
+            for field in counts:
+                counts[field] += int(elem.get(field, 0) or 0)
+            elem.clear()
+    summary = f"{counts['tests']} tests, {counts['failures']} failures, {counts['errors']} errors, {counts['skipped']} skipped"
+    return ArtifactReport("pytest-junit.xml", counts, summary, failed)
+
+def parse_coverage_xml(stream):
+    """Stream-parse a Cobertura coverage.xml, keeping only the least covered files"""
+    totals = {}
+    lowest = []  # Heap of (-percent, sequence, record): the best covered file sits on top
+    files = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "coverage":
+                totals = {key: elem.get(key) for key in ("line-rate", "lines-valid", "lines-covered")}
+            continue
+        if elem.tag == "class":
+            lines = elem.find("lines")
+            hits = [int(line.get("hits", 0) or 0) for line in lines] if lines is not None else []
+            record = CoverageRecord(elem.get("filename"), len(hits), sum(1 for hit in hits if hit > 0))
+            files += 1
+            heapq.heappush(lowest, (-record.percent, files, record))
+            if len(lowest) > ARTIFACT_MAX_RECORDS:
+                heapq.heappop(lowest)
+            elem.clear()
+        elif elem.tag == "package":
+            elem.clear()
+    
+    records = [record for _, _, record in sorted(lowest, key=lambda item: (-item[0], item[1]))]
+    lines_valid = int(totals.get("lines-valid") or sum(record.lines_valid for record in records))
+    lines_covered = int(totals.get("lines-covered") or sum(record.lines_covered for record in records))
+    percent = round(float(totals["line-rate"]) * 100, 1) if totals.get("line-rate") else (
+        round(100.0 * lines_covered / lines_valid, 1) if lines_valid else 100.0
+    )
+    counts = {"files": files, "lines_valid": lines_valid, "lines_covered": lines_covered, "percent": percent}
+    return ArtifactReport("coverage.xml", counts, f"{percent}% line coverage over {files} files", records, files)
+
+def parse_pylint_json(stream):
+    """Message counts per type and error/warning records from pylint's JSON report"""
+    counts = {}
+    records = []
+    for message in _read_json_report(stream, "pylint.json") or []:
+        kind = message.get("type", "unknown")
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind in ("fatal", "error", "warning"):
+            records.append(LintMessageRecord(
+                message.get("path"), message.get("line"), message.get("message-id"),
+                message.get("symbol"), kind, _clip(message.get("message"))
+            ))
+    return ArtifactReport("pylint.json", counts, _severity_summary(counts, "no messages"), records)
+
+def parse_bandit_json(stream):
+    """Issue counts per severity and issue records from bandit's JSON report"""
+    report = _read_json_report(stream, "bandit.json") or {}
+    counts = {}
+    records = []
+    for issue in report.get("results", []):
+        severity = issue.get("issue_severity", "UNDEFINED").lower()
+        counts[severity] = counts.get(severity, 0) + 1
+        records.append(SecurityIssueRecord(
+            issue.get("filename"), issue.get("line_number"), issue.get("test_id"),
+            issue.get("issue_severity"), issue.get("issue_confidence"), _clip(issue.get("issue_text"))
+        ))
+    for error in report.get("errors", []):
+        records.append(SecurityIssueRecord(error.get("filename"), None, None, None, None, _clip(error.get("reason"))))
+    return ArtifactReport("bandit.json", counts, _severity_summary(counts, "no issues"), records)
+
+def parse_safety_json(stream):
+    """Vulnerable packages from `safety check --json` (legacy list or 2.x report)"""
+    report = _read_json_report(stream, "safety.json") or {}
+    records = []
+    if isinstance(report, list):
+        # Legacy format: [package, affected spec, installed version, advisory, id]
+        for entry in report:
+            package, _, version, advisory, vulnerability_id = (list(entry) + [None] * 5)[:5]
+            records.append(VulnerabilityRecord(package, version, vulnerability_id, _clip(advisory)))
+    else:
+        for vulnerability in report.get("vulnerabilities", []):
+            records.append(VulnerabilityRecord(
+                vulnerability.get("package_name"), vulnerability.get("analyzed_version"),
+                vulnerability.get("vulnerability_id"), _clip(vulnerability.get("advisory"))
+            ))
+    counts = {"vulnerabilities": len(records)}
+    return ArtifactReport("safety.json", counts, f"{len(records)} vulnerabilities", records)
+
+# Report artifacts the generated jobs upload, parsed from the S3 stream into ArtifactReport
+ARTIFACT_PARSERS = {
+    "pytest-junit.xml": parse_junit_xml,
+    "coverage.xml": parse_coverage_xml,
+    "pylint.json": parse_pylint_json,
+    "bandit.json": parse_bandit_json,
+    "safety.json": parse_safety_json
+}
+
+def filter_log_lines(content, max_lines=PREFILTER_MAX_LINES):
+    """Error/warning lines of a plain log, with traceback continuation lines
+    
+    Only the last max_lines are kept (None keeps all): in a failing build
+    the error and its traceback come at the end, after any warnings.
+    """
+    kept = deque(maxlen=max_lines)
+    in_traceback = False
+    for line in content.splitlines():
+        if in_traceback and line[:1].isspace() and line.strip():
+            kept.append(line.rstrip())
+            continue
+        in_traceback = False
+        if LOG_SIGNAL_PATTERN.search(line) and not LOG_NOISE_PATTERN.search(line):
+            kept.append(line.rstrip())
+            in_traceback = "Traceback" in line
+    return list(kept)
+
+def log_test_counts(content):
+    """(tests, failures) from a pytest or unittest summary line, or None"""
+    ran = None
+    failures = 0
+    for line in content.splitlines():
+        match = PYTEST_SUMMARY_PATTERN.match(line)
+        if match:
+            outcomes = {kind: int(count) for count, kind in re.findall(r"(\d+) (\w+)", match.group(1))}
+            failed = outcomes.get("failed", 0) + outcomes.get("error", 0) + outcomes.get("errors", 0)
+            return sum(outcomes.values()), failed
+        match = UNITTEST_RAN_PATTERN.match(line)
+        if match:
+            ran = int(match.group(1))
+        match = UNITTEST_FAILED_PATTERN.match(line)
+        if match:
+            failures = sum(int(count) for count in re.findall(r"(?:failures|errors)=(\d+)", match.group(1)))
+    return (ran, failures) if ran is not None else None
+
+def prefilter_logs(logs_data, max_lines=PREFILTER_MAX_LINES):
+    """Reduce logs to what the model needs, computing exact counts locally
+    
+    Parsed report artifacts (ArtifactReport values) become their summary
+    line plus failure/issue records; plain .log files keep only
+    error/warning lines; anything else (HTML reports, coverage pages) is
+    dropped; max_lines caps the lines kept per log (None: no cap). Returns
+    (filtered logs_data, findings) where findings holds
+    each report as a dict and, when a test report was found, the exact
+    tests_executed / failures (and line coverage from coverage.xml).
+    """
+    filtered = {}
+    findings = {
+        "artifacts": {}, "tests_executed": None, "failures": None, "coverage": None,
+        "input_chars": 0, "output_chars": 0
+    }
+    log_counts = None
+    
+    for stage, files in logs_data.items():
+        for file_name, content in files.items():
+            lines = []
+            if isinstance(content, ArtifactReport):
+                findings["artifacts"][file_name] = content.to_dict()
+                lines = [f"{file_name}: {content.summary}"] + content.finding_lines()
+                if file_name == "pytest-junit.xml":
+                    findings["tests_executed"] = content.counts["tests"]
+                    findings["failures"] = content.counts["failures"] + content.counts["errors"]
+                elif file_name == "coverage.xml":
+                    findings["coverage"] = content.counts["percent"]
+            elif file_name.endswith(".log"):
+                findings["input_chars"] += len(content)
+                lines = filter_log_lines(content, max_lines)
+                log_counts = log_counts or log_test_counts(content)
+            
+            if lines:
+                excerpt = "\n".join(lines)
+                filtered.setdefault(stage, {})[file_name] = excerpt
+                findings["output_chars"] += len(excerpt)
+    
+    if findings["tests_executed"] is None and log_counts:
+        findings["tests_executed"], findings["failures"] = log_counts
+    
+    return filtered, findings
+
+def prefilter_keeps(key):
+    """Whether prefilter_logs would keep anything from this S3 object"""
+    file_name = key.rsplit('/', 1)[-1]
+    return file_name in ARTIFACT_PARSERS or file_name.endswith(".log")
+
+def apply_local_findings(analysis, findings):
+    """Replace model-estimated counts with the ones parsed from the reports"""
+    if not findings:
+        return analysis
+    if findings["tests_executed"] is not None:
+        analysis["tests_executed"] = findings["tests_executed"]
+        analysis["failures"] = findings["failures"]
+        analysis["counts_source"] = "reports"
+    if findings["coverage"] is not None:
+        analysis["coverage"] = findings["coverage"]
+    analysis["local_findings"] = findings
+    return analysis
+
+def merge_stage_results(pipeline_id, stages, results):
+    """Combine per-stage results (incremental mode) into one analysis"""
+    analysis = {
+        "pipeline_id": pipeline_id,
+        "stages_analyzed": list(stages.keys()),
+        "total_log_files": sum(len(stage_objects) for stage_objects in stages.values()),
+        "tests_executed": 0,
+        "failures": 0,
+        "suggestions": [],
+        "analysis_mode": "incremental",
+        "stages": {}
+    }
+    seen = set()
+    artifacts = {}
+    # Counts parsed from test reports win over the model's per-stage estimates
+    exact = any(result.get("counts_exact") for result in results.values())
+    if exact:
+        analysis["counts_source"] = "reports"
+    for stage in stages:
+        result = results.get(stage)
+        if result is None:
+            continue
+        if result.get("counts_exact") or not exact:
+            for field in ("tests_executed", "failures"):
+                if isinstance(result.get(field), int):
+                    analysis[field] += result[field]
+        for suggestion in result["suggestions"]:
+            identity = (suggestion.get("category"), suggestion.get("recommendation"))
+            if identity not in seen:
+                seen.add(identity)
+                analysis["suggestions"].append(suggestion)
+        findings = result.get("findings") or {}
+        artifacts.update(findings.get("artifacts", {}))
+        if findings.get("coverage") is not None and "coverage" not in analysis:
+            analysis["coverage"] = findings["coverage"]
+        analysis["stages"][stage] = {
+            "objects": result["objects"],
+            "tests_executed": result.get("tests_executed"),
+            "failures": result.get("failures"),
+            "analyzed_at": result["analyzed_at"]
+        }
+    if artifacts:
+        analysis["local_findings"] = {"artifacts": artifacts}
+    return analysis
+
+def split_log_chunks(content, chunk_chars):
+    """Split a log into pieces of at most chunk_chars, preferring line boundaries"""
+    chunks = []
+    start = 0
+    while start < len(content):
+        end = min(start + chunk_chars, len(content))
+        if end < len(content):
+            newline = content.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        chunks.append(content[start:end])
+        start = end
+    return chunks
+
+def select_log_chunks(logs_data, char_budget, chunk_chars=None):
+    """Chunk every stage/file and keep as many chunks as fit in char_budget
+    
+    Chunks are taken round-robin across files starting from each file's
+    end, so every file's tail is analyzed before any file's middle.
+    Returns (chunks in stage/file/part order, number of chunks dropped).
+    """
+    chunk_chars = chunk_chars or ANALYSIS_CHUNK_CHARS
+    per_file = []
+    for stage, files in logs_data.items():
+        for file_name, content in files.items():
+            pieces = split_log_chunks(content, chunk_chars)
+            per_file.append([
+                {"stage": stage, "file": file_name, "part": index + 1, "parts": len(pieces), "text": piece}
+                for index, piece in enumerate(pieces)
+            ])
+    
+    selected = []
+    used = 0
+    total = sum(len(pieces) for pieces in per_file)
+    depth = 0
+    while len(selected) < total:
+        progressed = False
+        for pieces in per_file:
+            if depth < len(pieces):
+                chunk = pieces[-(depth + 1)]
+                progressed = True
+                if used + len(chunk["text"]) <= char_budget:
+                    selected.append(chunk)
+                    used += len(chunk["text"])
+        depth += 1
+        if not progressed:
+            break
+    
+    order = {id(chunk): position for position, chunk in enumerate(chunk for pieces in per_file for chunk in pieces)}
+    selected.sort(key=lambda chunk: order[id(chunk)])
+    return selected, total - len(selected)
+
+def bedrock_request_body(prompt, max_tokens=1500):
+    return json.dumps({
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": max_tokens,
+        "temperature": 0.3,
+        "top_p": 0.9
+    })
+
+def analysis_prompt(project_name, pipeline_id, stages_summary, logs_text,
+                    intro="Analyze these CI/CD pipeline logs and provide professional improvement suggestions."):
+    return f"""
+{intro}
+
+Project: {project_name}
+Pipeline ID: {pipeline_id}
+Stages: {', '.join(stages_summary.keys())}
+
+Logs Analysis:
+{logs_text}
+
+Provide analysis in JSON format:
+{{
+    "pipeline_id": "{pipeline_id}",
+    "stages_analyzed": {list(stages_summary.keys())},
+    "total_log_files": {sum(stages_summary.values())},
+    "tests_executed": <number>,
+    "failures": <number>,
+    "suggestions": [
+        {{"category": "category_name", "recommendation": "specific_recommendation"}}
+    ]
+}}
+"""
+
+class JSONObjectScanner:
+    """Incremental scanner for the first top-level JSON object in streamed text
+    
+    feed() returns the objects nested directly inside it (e.g. each
+    suggestion) as soon as they close; document is set once the whole
+    object has closed and parsed. Text around the object is ignored.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = None
+        self.nested_start = None
+        self.document = None
+    
+    def feed(self, chunk):
+        self.text += chunk
+        completed = []
+        while self.position < len(self.text) and self.document is None:
+            char = self.text[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth > 0:
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+                if self.depth == 1:
+                    self.start = self.position
+                elif self.depth == 2:
+                    self.nested_start = self.position
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 1:
+                    try:
+                        completed.append(json.loads(self.text[self.nested_start:self.position + 1]))
+                    except ValueError:
+                        pass
+                elif self.depth == 0:
+                    try:
+                        self.document = json.loads(self.text[self.start:self.position + 1])
+                    except ValueError:
+                        pass  # Not JSON after all: keep looking for the next object
+            self.position += 1
+        return completed
+
+def extract_analysis_json(analysis_text):
+    """Extract the JSON analysis object from a model completion (None if absent)"""
+    scanner = JSONObjectScanner()
+    scanner.feed(analysis_text or '')
+    if scanner.document is not None:
+        return scanner.document
+    json_match = re.search(r'\{.*\}', analysis_text or '', re.DOTALL)
+    if json_match:
+        return json.loads(json_match.group())
+    return None
 
 class S3LogsAnalyzer:
     """Class to handle S3 logs reading and Bedrock analysis"""
     
-    def __init__(self, s3_client, bedrock_client):
+    def __init__(self, s3_client, bedrock_client, max_concurrency=S3_FETCH_CONCURRENCY,
+                 fetch_budget=S3_FETCH_BUDGET_SECONDS, read_mode=S3_READ_MODE, cache=None):
         self.s3_client = s3_client
         self.bedrock_client = bedrock_client
+        self.cache = cache
         self.bucket_name = S3_BUCKET_NAME
+        self.max_concurrency = max_concurrency
+        self.fetch_budget = fetch_budget
+        self.read_mode = read_mode
     
-    def read_pipeline_logs(self, project_name, pipeline_id):
-        """Read all logs from S3 for a specific pipeline"""
-        logs_prefix = f"projects/{project_name}/pipelines/{pipeline_id}"
+    def list_pipeline_objects(self, project_name, pipeline_id, deadline=None):
+        """List every log object of a pipeline, following continuation tokens"""
+        logs_prefix = f"projects/{project_name}/pipelines/{pipeline_id}/"
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        objects = []
+        complete = True
+        
+        pages = iter(paginator.paginate(Bucket=self.bucket_name, Prefix=logs_prefix))
+        while True:
+            # Each page is one ListObjectsV2 call, issued by next()
+            started = time.monotonic()
+            try:
+                page = next(pages)
+            except StopIteration:
+                break
+            except Exception:
+                metrics.record_upstream("s3", "list", time.monotonic() - started, error=True)
+                raise
+            metrics.record_upstream("s3", "list", time.monotonic() - started)
+            objects.extend(page.get('Contents', []))
+            if deadline is not None and time.monotonic() >= deadline:
+                complete = False
+                break
+        
+        return objects, complete
+    
+    def _get_bytes(self, key, byte_range=None, max_bytes=None):
+        """GET an object (or a byte range of it), reading at most max_bytes"""
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if byte_range:
+            params["Range"] = byte_range
+        with metrics.track_upstream("s3", "get"):
+            body = self.s3_client.get_object(**params)['Body']
+            try:
+                return body.read(max_bytes) if max_bytes else body.read()
+            finally:
+                body.close()
+    
+    def _read_object(self, key, size=None, head_bytes=LOG_HEAD_CHARS, tail_bytes=LOG_TAIL_CHARS):
+        """Read one log object, returning (text, bytes_transferred)
+        
+        In "window" mode only the head and tail the analyzer keeps are
+        fetched, using byte-range GETs, so memory per object is bounded by
+        head_bytes + tail_bytes whatever the artifact size.
+        """
+        window = head_bytes + tail_bytes
+        
+        if self.read_mode != "window":
+            data = self._get_bytes(key, max_bytes=S3_LOG_MAX_BYTES)
+            return data.decode('utf-8', errors='replace'), len(data)
+        
+        if size is not None and size <= window:
+            data = self._get_bytes(key)
+            return data.decode('utf-8', errors='replace'), len(data)
+        
+        head = self._get_bytes(key, f"bytes=0-{head_bytes - 1}")
+        tail = self._get_bytes(key, f"bytes=-{tail_bytes}")
+        if size is None and len(head) < head_bytes:
+            # Object turned out smaller than the head window: head is the whole file
+            return head.decode('utf-8', errors='replace'), len(head) + len(tail)
+        text = (
+            head.decode('utf-8', errors='replace')
+            + LOG_TRUNCATION_MARKER
+            + tail.decode('utf-8', errors='replace')
+        )
+        return text, len(head) + len(tail)
+    
+    def _parse_object(self, key, size=None):
+        """Parse a report artifact straight from the S3 stream, returning (ArtifactReport, bytes)"""
+        parser = ARTIFACT_PARSERS[key.rsplit('/', 1)[-1]]
+        # Parsing consumes the body as it downloads, so the parse time is part of the GET
+        with metrics.track_upstream("s3", "get"):
+            body = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)['Body']
+            try:
+                return parser(body), size or 0
+            finally:
+                body.close()
+    
+    @staticmethod
+    def stage_of(key):
+        """Stage a log object belongs to: its parent "directory" under the pipeline prefix"""
+        return key.split('/')[-2] if '/' in key else 'unknown'
+    
+    def read_pipeline_logs(self, project_name, pipeline_id, fetch_stats=None, window=None, objects=None):
+        """Read all logs from S3 for a specific pipeline
+        
+        Objects are downloaded concurrently (at most max_concurrency at once)
+        within fetch_budget seconds; whatever finished in time is returned.
+        Pass a dict as fetch_stats to receive listing/download counters and
+        whether the result is partial. window=(head_bytes, tail_bytes)
+        overrides the default ranged-read window. With LOG_PREFILTER,
+        report artifacts come back as ArtifactReport instead of text and
+        objects the prefilter would drop are not downloaded.
+        Pass objects (listing entries) to fetch only those, without listing.
+        """
+        head_bytes, tail_bytes = window or (LOG_HEAD_CHARS, LOG_TAIL_CHARS)
+        started = time.monotonic()
+        deadline = started + self.fetch_budget
+        stats = fetch_stats if fetch_stats is not None else {}
         
         try:
             # List all objects in the pipeline logs
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=logs_prefix
-            )
+            if objects is None:
+                objects, listing_complete = self.list_pipeline_objects(project_name, pipeline_id, deadline)
+            else:
+                listing_complete = True
+            
+            objects_listed = len(objects)
+            bytes_listed = sum(obj.get('Size', 0) for obj in objects)
+            if LOG_PREFILTER:
+                # Don't download what the prefilter would drop (HTML reports, coverage pages)
+                objects = [obj for obj in objects if prefilter_keeps(obj['Key'])]
+            
+            stats.update({
+                "objects_listed": objects_listed,
+                "objects_ignored": objects_listed - len(objects),
+                "objects_fetched": 0,
+                "objects_failed": 0,
+                "bytes_listed": bytes_listed,
+                "bytes_fetched": 0,
+                "read_mode": self.read_mode,
+                "partial": not listing_complete
+            })
             
-            if 'Contents' not in response:
+            if not objects:
                 return {"error": "No logs found for this pipeline"}
             
+            contents = {}
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(self.max_concurrency, len(objects))),
+                thread_name_prefix="onedev-s3"
+            )
+            try:
+                pending = {}
+                for obj in objects:
+                    if LOG_PREFILTER and obj['Key'].rsplit('/', 1)[-1] in ARTIFACT_PARSERS:
+                        # Reports become typed records; they are never held as text
+                        future = executor.submit(self._parse_object, obj['Key'], obj.get('Size'))
+                    else:
+                        future = executor.submit(self._read_object, obj['Key'], obj.get('Size'), head_bytes, tail_bytes)
+                    pending[future] = obj['Key']
+                while pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = pending.pop(future)
+                        try:
+                            contents[key], transferred = future.result()
+                            stats["bytes_fetched"] += transferred
+                        except Exception as e:
+                            logger.warning("Error reading log %s: %s", key, e)
+                            stats["objects_failed"] += 1
+                
+                if pending:
+                    logger.warning("S3 fetch budget of %ss exhausted, %d logs skipped", self.fetch_budget, len(pending))
+                    stats["partial"] = True
+                    stats["objects_skipped"] = len(pending)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+            
             logs_data = {}
             
-            for obj in response['Contents']:
+            # Organize logs by stage, in listing order
+            for obj in objects:
                 key = obj['Key']
-                try:
-                    # Read the log file
-                    log_response = self.s3_client.get_object(
-                        Bucket=self.bucket_name,
-                        Key=key
-                    )
-                    log_content = log_response['Body'].read().decode('utf-8')
-                    
-                    # Organize logs by stage
-                    stage_name = key.split('/')[-2] if '/' in key else 'unknown'
-                    file_name = key.split('/')[-1]
-                    
-                    if stage_name not in logs_data:
-                        logs_data[stage_name] = {}
-                    
-                    logs_data[stage_name][file_name] = log_content
-                    
-                except Exception as e:
-                    print(f"Error reading log {key}: {e}")
+                if key not in contents:
                     continue
+                stage_name = self.stage_of(key)
+                file_name = key.split('/')[-1]
+                
+                if stage_name not in logs_data:
+                    logs_data[stage_name] = {}
+                
+                logs_data[stage_name][file_name] = contents[key]
+            
+            stats["objects_fetched"] = len(contents)
+            stats["elapsed_seconds"] = round(time.monotonic() - started, 3)
+            
+            if not logs_data:
+                return {"error": "No logs could be read for this pipeline"}
             
             return logs_data
             
         except Exception as e:
-            print(f"Error reading S3 logs: {e}")
+            logger.error("Error reading S3 logs: %s", e)
             return {"error": f"Failed to read logs: {str(e)}"}
     
-    def analyze_logs_with_bedrock(self, project_name, pipeline_id):
-        """Analyze logs using Bedrock Nova Pro"""
+    def _invoke_model(self, prompt, max_tokens=1500):
+        """Send one prompt to Bedrock and return the completion text"""
+        body = bedrock_request_body(prompt, max_tokens)
+        with metrics.track_upstream("bedrock", "invoke_model"):
+            response = self.bedrock_client.invoke_model(
+                body=body,
+                modelId=BEDROCK_MODEL_ID,
+                contentType="application/json"
+            )
+            response_body = json.loads(response.get('body').read())
+        
+        if 'output' in response_body and 'message' in response_body['output']:
+            content = response_body['output']['message'].get('content', [])
+            if content and len(content) > 0:
+                return content[0].get('text', '')
+        return ''
+    
+    def _stream_model(self, prompt, max_tokens=1500):
+        """Send one prompt to Bedrock and yield the completion text as it arrives"""
+        # Timed until the stream is drained or abandoned, like a non-streamed call
+        with metrics.track_upstream("bedrock", "invoke_model_stream"):
+            response = self.bedrock_client.invoke_model_with_response_stream(
+                body=bedrock_request_body(prompt, max_tokens),
+                modelId=BEDROCK_MODEL_ID,
+                contentType="application/json"
+            )
+            events = response.get('body')
+            try:
+                for event in events:
+                    chunk = event.get('chunk')
+                    if not chunk:
+                        continue
+                    delta = json.loads(chunk['bytes']).get('contentBlockDelta', {}).get('delta', {})
+                    if delta.get('text'):
+                        yield delta['text']
+            finally:
+                events.close()
+    
+    def _stream_analysis_json(self, prompt, timeout=None):
+        """Stream a completion, yielding each suggestion as soon as it is complete
+        
+        Returns the analysis once its JSON closes (the rest of the stream is
+        not waited for), or the suggestions received so far (possibly none)
+        marked partial when timeout seconds pass first. The clock starts
+        with the first delta, not when the analysis (or the slot wait) did.
+        """
+        timeout = BEDROCK_STREAM_DEADLINE if timeout is None else timeout
+        deadline = None
+        scanner = JSONObjectScanner()
+        suggestions = []
+        deltas = self._stream_model(prompt)
+        try:
+            for text in deltas:
+                deadline = deadline or time.monotonic() + timeout
+                for nested in scanner.feed(text):
+                    if "recommendation" in nested:
+                        suggestions.append(nested)
+                        yield "suggestion", nested
+                if scanner.document is not None or time.monotonic() >= deadline:
+                    break
+        finally:
+            deltas.close()
+        
+        if scanner.document is not None:
+            return scanner.document
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.warning("Bedrock stream deadline reached after %d suggestions", len(suggestions))
+            return {"suggestions": suggestions, "partial": True}
+        return None
+    
+    def _finalize_analysis(self, analysis, project_name, pipeline_id, cache_key, fetch_stats):
+        analysis["analysis_timestamp"] = datetime.now().isoformat()
+        analysis["log_source"] = f"S3: s3://{self.bucket_name}/projects/{project_name}/pipelines/{pipeline_id}"
+        analysis["s3_location"] = f"s3://{self.bucket_name}/projects/{project_name}/pipelines/{pipeline_id}"
+        if cache_key:
+            self.cache.set(cache_key, analysis)
+        analysis["cached"] = False
+        analysis["log_fetch"] = fetch_stats
+        return analysis
+    
+    def _cached_analysis(self, cache_key, project_name, pipeline_id, fetch_stats):
+        if not cache_key:
+            return None
+        cached_analysis = self.cache.get(cache_key)
+        if cached_analysis is not None:
+            logger.info("Bedrock analysis cache hit", extra={"project": project_name, "pipeline_id": pipeline_id})
+            cached_analysis["cached"] = True
+            cached_analysis["log_fetch"] = fetch_stats
+        return cached_analysis
+    
+    def analyze_logs_with_bedrock(self, project_name, pipeline_id, mode=None):
+        """Analyze logs using Bedrock Nova Pro
+        
+        mode "single" sends one head+tail excerpt per file in one prompt;
+        "chunked" map-reduces larger log windows (see _chunked_prompt).
+        """
+        for event, payload in self.analysis_steps(project_name, pipeline_id, mode):
+            if event == "done":
+                return payload
+    
+    def analysis_steps(self, project_name, pipeline_id, mode=None, stream=False):
+        """Run an analysis, yielding ("suggestion", item) events then ("done", analysis)
+        
+        With stream=True the completion is read with the response-stream
+        API: suggestions are yielded as soon as each one is complete, and
+        BEDROCK_STREAM_DEADLINE seconds after the stream opens whatever
+        arrived is returned as a partial (uncached) analysis. Once chunk
+        summaries have been paid for, a failed reduce returns them as an
+        incomplete analysis rather than demo data.
+        """
+        mode = mode or ANALYSIS_MODE
+        
+        if mode == "incremental":
+            yield from self._incremental_steps(project_name, pipeline_id)
+            return
         
         # Read logs from S3
-        logs_data = self.read_pipeline_logs(project_name, pipeline_id)
+        fetch_stats = {}
+        window = (ANALYSIS_CHUNKED_HEAD_BYTES, ANALYSIS_CHUNKED_TAIL_BYTES) if mode == "chunked" else None
+        logs_data = self.read_pipeline_logs(project_name, pipeline_id, fetch_stats, window=window)
         
         if "error" in logs_data:
             # Return demo data if logs not available
-            return self._get_demo_analysis(project_name, pipeline_id)
+            yield "done", self._get_demo_analysis(project_name, pipeline_id)
+            return
+        
+        stages_summary = {stage: len(files) for stage, files in logs_data.items()}
+        findings = None
+        if LOG_PREFILTER:
+            # Exact counts from the reports; only errors and warnings go to the model.
+            # Chunked mode keeps every matching line: the map phase is there to read them all
+            logs_data, findings = prefilter_logs(logs_data, max_lines=None if mode == "chunked" else PREFILTER_MAX_LINES)
+            if mode == "chunked" and self._logs_chars(logs_data) <= ANALYSIS_PROMPT_LOG_CHARS:
+                mode = "single"  # What is left fits one prompt: no map calls needed
         
+        # Analyze with Bedrock
+        chunk_stats = None
+        try:
+            if mode == "chunked":
+                prompt, chunk_stats = self._chunked_prompt(project_name, pipeline_id, logs_data, stages_summary)
+                cache_key = self.cache.make_key(BEDROCK_MODEL_ID, "reduce", bedrock_request_body(prompt)) if self.cache else None
+            else:
+                prompt = self._single_prompt(project_name, pipeline_id, logs_data, stages_summary, findings is not None)
+                # Identical logs produce an identical prompt: reuse the previous analysis
+                cache_key = self.cache.make_key(BEDROCK_MODEL_ID, bedrock_request_body(prompt)) if self.cache else None
+            
+            cached_analysis = self._cached_analysis(cache_key, project_name, pipeline_id, fetch_stats)
+            if cached_analysis is not None:
+                yield "done", apply_local_findings(cached_analysis, findings)
+                return
+            
+            if stream:
+                analysis = yield from self._stream_analysis_json(prompt)
+            else:
+                analysis = extract_analysis_json(self._invoke_model(prompt))
+            
+            if analysis is None:
+                if chunk_stats is None:
+                    yield "done", self._get_demo_analysis(project_name, pipeline_id)
+                    return
+                analysis = {"suggestions": [], "partial": True, "fallback_reason": "The model returned no analysis JSON"}
+            
+            if analysis.get("partial"):
+                cache_key = None  # Never reuse an analysis cut short by the deadline
+                analysis.update({
+                    "pipeline_id": pipeline_id,
+                    "stages_analyzed": list(stages_summary.keys()),
+                    "total_log_files": sum(stages_summary.values())
+                })
+            if chunk_stats:
+                analysis["analysis_mode"] = "chunked"
+                analysis["chunks"] = chunk_stats
+            analysis = apply_local_findings(analysis, findings)
+            yield "done", self._finalize_analysis(analysis, project_name, pipeline_id, cache_key, fetch_stats)
+            
+        except Exception as e:
+            if chunk_stats is not None:
+                # The map calls are paid for: report what they covered, not demo data
+                logger.error("Bedrock reduce error after %d chunk summaries: %s", chunk_stats["summarized"], e)
+                analysis = {
+                    "pipeline_id": pipeline_id,
+                    "stages_analyzed": list(stages_summary.keys()),
+                    "total_log_files": sum(stages_summary.values()),
+                    "suggestions": [],
+                    "partial": True,
+                    "fallback_reason": str(e),
+                    "analysis_mode": "chunked",
+                    "chunks": chunk_stats
+                }
+                analysis = apply_local_findings(analysis, findings)
+                yield "done", self._finalize_analysis(analysis, project_name, pipeline_id, None, fetch_stats)
+                return
+            logger.error("Bedrock analysis error, using demo data: %s", e)
+            analysis = self._get_demo_analysis(project_name, pipeline_id)
+            analysis["fallback_reason"] = str(e)
+            yield "done", analysis
+    
+    def _incremental_steps(self, project_name, pipeline_id):
+        """Per-stage analysis that only re-analyzes stages whose logs changed
+        
+        Each stage's result is cached under the S3 keys and ETags of its
+        objects, which the listing returns without any GET. A rerun fetches
+        and analyzes only stages with new or changed objects (e.g. a retried
+        security job), in parallel, and merges them with the reused results.
+        """
+        fetch_stats = {}
+        try:
+            objects, _ = self.list_pipeline_objects(project_name, pipeline_id, time.monotonic() + self.fetch_budget)
+        except Exception as e:
+            logger.error("Error listing S3 logs: %s", e)
+            objects = []
+        if LOG_PREFILTER:
+            # A stage made only of objects the prefilter drops (HTML coverage, a summary .txt)
+            # would never read anything and be re-analyzed, and fail, on every run
+            objects = [obj for obj in objects if prefilter_keeps(obj['Key'])]
+        if not objects:
+            yield "done", self._get_demo_analysis(project_name, pipeline_id)
+            return
+        
+        stages = OrderedDict()
+        for obj in objects:
+            stages.setdefault(self.stage_of(obj['Key']), []).append(obj)
+        
+        results = {}
+        stage_keys = {}
+        changed = []
+        for stage, stage_objects in stages.items():
+            fingerprint = sorted((obj['Key'], obj.get('ETag', '')) for obj in stage_objects)
+            stage_keys[stage] = self.cache.make_key(BEDROCK_MODEL_ID, "stage", stage, fingerprint) if self.cache else None
+            cached_stage = self.cache.get(stage_keys[stage]) if stage_keys[stage] else None
+            if cached_stage is None:
+                changed.append(stage)
+                continue
+            results[stage] = cached_stage
+            for suggestion in cached_stage["suggestions"]:
+                yield "suggestion", suggestion
+        reused = [stage for stage in stages if stage in results]
+        logger.info(
+            "Incremental analysis",
+            extra={"project": project_name, "pipeline_id": pipeline_id, "stages_reused": len(reused), "stages_changed": len(changed)}
+        )
+        
+        failed = []
+        if changed:
+            logs_data = self.read_pipeline_logs(
+                project_name, pipeline_id, fetch_stats,
+                objects=[obj for stage in changed for obj in stages[stage]]
+            )
+            if "error" in logs_data:
+                logs_data = {}
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(ANALYSIS_MAP_CONCURRENCY, len(changed))),
+                thread_name_prefix="onedev-stage"
+            )
+            try:
+                pending = {
+                    executor.submit(
+                        in_current_context(self._analyze_stage), project_name, pipeline_id, stage,
+                        logs_data.get(stage, {}), len(stages[stage])
+                    ): stage
+                    for stage in changed
+                }
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = pending.pop(future)
+                        try:
+                            results[stage] = future.result()
+                        except Exception as e:
+                            logger.error("Stage %s analysis error: %s", stage, e)
+                            failed.append(stage)
+                            continue
+                        if stage_keys[stage]:
+                            self.cache.set(stage_keys[stage], results[stage])
+                        for suggestion in results[stage]["suggestions"]:
+                            yield "suggestion", suggestion
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        if not results:
+            analysis = self._get_demo_analysis(project_name, pipeline_id)
+            analysis["fallback_reason"] = f"No stage could be analyzed: {', '.join(failed)}"
+            yield "done", analysis
+            return
+        
+        fetch_stats["objects_reused"] = sum(len(stages[stage]) for stage in reused)
+        analysis = merge_stage_results(pipeline_id, stages, results)
+        analysis["incremental"] = {
+            "stages_reused": reused,
+            "stages_analyzed": [stage for stage in changed if stage not in failed],
+            "stages_failed": failed
+        }
+        yield "done", self._finalize_analysis(analysis, project_name, pipeline_id, None, fetch_stats)
+    
+    def _analyze_stage(self, project_name, pipeline_id, stage, files, file_count):
+        """Analyze one stage's logs with Bedrock; returns the cacheable stage result"""
+        if not files:
+            raise ValueError(f"No logs could be read for stage {stage}")
+        findings = None
+        if LOG_PREFILTER:
+            filtered, findings = prefilter_logs({stage: files})
+            files = filtered.get(stage, {})
+        
+        stage_logs = ""
+        for file_name, content in files.items():
+            stage_logs += f"\n--- {file_name} ---\n"
+            stage_logs += content if findings is not None else log_excerpt(content)
+            stage_logs += "\n"
+        
+        prompt = analysis_prompt(
+            project_name, pipeline_id, {stage: file_count}, stage_logs[:ANALYSIS_PROMPT_LOG_CHARS] or "(no errors or warnings found)",
+            intro=f"Analyze the logs of the {stage} stage of this CI/CD pipeline and provide professional improvement suggestions."
+        )
+        stage_analysis = extract_analysis_json(self._invoke_model(prompt))
+        if stage_analysis is None:
+            raise ValueError(f"No JSON analysis returned for stage {stage}")
+        
+        result = {
+            "stage": stage,
+            "objects": file_count,
+            "tests_executed": stage_analysis.get("tests_executed"),
+            "failures": stage_analysis.get("failures"),
+            "suggestions": stage_analysis.get("suggestions", []),
+            "findings": findings,
+            "analyzed_at": datetime.now().isoformat()
+        }
+        if findings and findings["tests_executed"] is not None:
+            result["tests_executed"] = findings["tests_executed"]
+            result["failures"] = findings["failures"]
+            result["counts_exact"] = True
+        return result
+    
+    def _single_prompt(self, project_name, pipeline_id, logs_data, stages_summary, prefiltered):
         # Prepare logs for analysis
         consolidated_logs = ""
-        stages_summary = {}
         
         for stage, files in logs_data.items():
-            stages_summary[stage] = len(files)
             consolidated_logs += f"\n=== {stage.upper()} STAGE ===\n"
             
             for file_name, content in files.items():
                 consolidated_logs += f"\n--- {file_name} ---\n"
-                consolidated_logs += content[:1000]  # Limit content for analysis
+                # Pre-filtered excerpts are already compact; raw logs get the head + tail window
+                consolidated_logs += content if prefiltered else log_excerpt(content)
                 consolidated_logs += "\n"
         
-        # Analyze with Bedrock
+        return analysis_prompt(project_name, pipeline_id, stages_summary, consolidated_logs[:ANALYSIS_PROMPT_LOG_CHARS])
+    
+    @staticmethod
+    def _logs_chars(logs_data):
+        return sum(len(content) for files in logs_data.values() for content in files.values())
+    
+    def _chunked_prompt(self, project_name, pipeline_id, logs_data, stages_summary):
+        """Map phase of a map-reduce analysis; returns (reduce prompt, chunk stats)
+        
+        Logs are split per stage/file into chunks; chunks are picked tail
+        first (where failures sit) until ANALYSIS_TOKEN_BUDGET is spent and
+        summarized in parallel (ANALYSIS_MAP_CONCURRENCY calls at most,
+        within ANALYSIS_MAP_TIMEOUT seconds). The returned prompt reduces
+        the summaries into the final analysis. Chunk summaries are cached
+        individually so unchanged chunks are not summarized again.
+        """
+        chunks, dropped = select_log_chunks(logs_data, ANALYSIS_TOKEN_BUDGET * CHARS_PER_TOKEN)
+        
+        summaries = {}
+        pending = {}
+        timed_out = 0
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(ANALYSIS_MAP_CONCURRENCY, len(chunks))),
+            thread_name_prefix="onedev-map"
+        )
         try:
-            prompt = f"""
-Analyze these CI/CD pipeline logs and provide professional improvement suggestions.
-
-Project: {project_name}
-Pipeline ID: {pipeline_id}
-Stages: {', '.join(stages_summary.keys())}
+            for index, chunk in enumerate(chunks):
+                pending[executor.submit(in_current_context(self._summarize_chunk), chunk)] = index
+            done, not_done = wait(pending, timeout=ANALYSIS_MAP_TIMEOUT)
+            for future in done:
+                try:
+                    summaries[pending[future]] = future.result()
+                except Exception as e:
+                    logger.warning("Chunk summary failed: %s", e)
+            timed_out = len(not_done)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if not summaries:
+            raise RuntimeError("No log chunk could be summarized")
+        
+        chunk_notes = "\n".join(
+            f"[{chunks[index]['stage']}/{chunks[index]['file']} part {chunks[index]['part']}] {summaries[index]}"
+            for index in sorted(summaries)
+        )
+        prompt = analysis_prompt(
+            project_name, pipeline_id, stages_summary, chunk_notes,
+            intro="These are summaries of CI/CD pipeline log chunks. Combine them into one analysis and provide professional improvement suggestions."
+        )
+        chunk_stats = {
+            "total": len(chunks) + dropped,
+            "summarized": len(summaries),
+            "dropped_for_budget": dropped,
+            "timed_out": timed_out,
+            "token_budget": ANALYSIS_TOKEN_BUDGET
+        }
+        return prompt, chunk_stats
+    
+    def _summarize_chunk(self, chunk):
+        """Map step: short factual summary of one log chunk"""
+        prompt = f"""
+Summarize this chunk of a CI/CD log in at most 5 short lines.
+Report the number of tests run and failed if visible, then every error,
+failure or warning with its message. Do not give advice.
 
-Logs Analysis:
-{consolidated_logs[:4000]}
+Stage: {chunk['stage']}
+File: {chunk['file']} (part {chunk['part']} of {chunk['parts']})
 
-Provide analysis in JSON format:
-{{
-    "pipeline_id": "{pipeline_id}",
-    "stages_analyzed": {list(stages_summary.keys())},
-    "total_log_files": {sum(stages_summary.values())},
-    "tests_executed": <number>,
-    "failures": <number>,
-    "suggestions": [
-        {{"category": "category_name", "recommendation": "specific_recommendation"}}
-    ]
-}}
+{chunk['text']}
 """
-            
-            body = json.dumps({
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": 1500,
-                "temperature": 0.3,
-                "top_p": 0.9
-            })
-            
-            response = self.bedrock_client.invoke_model(
-                body=body,
-                modelId=BEDROCK_MODEL_ID,
-                contentType="application/json"
-            )
-            
-            response_body = json.loads(response.get('body').read())
-            
-            if 'output' in response_body and 'message' in response_body['output']:
-                content = response_body['output']['message'].get('content', [])
-                if content and len(content) > 0:
-                    analysis_text = content[0].get('text', '')
-                    
-                    # Extract JSON from response
-                    json_match = re.search(r'\{.*\}', analysis_text, re.DOTALL)
-                    if json_match:
-                        analysis = json.loads(json_match.group())
-                        analysis["analysis_timestamp"] = datetime.now().isoformat()
-                        analysis["log_source"] = f"S3: s3://{self.bucket_name}/projects/{project_name}/pipelines/{pipeline_id}"
-                        analysis["s3_location"] = f"s3://{self.bucket_name}/projects/{project_name}/pipelines/{pipeline_id}"
-                        return analysis
-            
-            return self._get_demo_analysis(project_name, pipeline_id)
-            
-        except Exception as e:
-            print(f"Bedrock analysis error: {e}")
-            return self._get_demo_analysis(project_name, pipeline_id)
+        cache_key = self.cache.make_key(BEDROCK_MODEL_ID, "map", prompt) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached["summary"]
+        
+        summary = self._invoke_model(prompt, max_tokens=ANALYSIS_MAP_MAX_TOKENS).strip()
+        if cache_key:
+            self.cache.set(cache_key, {"summary": summary})
+        return summary
     
     def _get_demo_analysis(self, project_name, pipeline_id):
         """Return demo analysis data"""
@@ -487,200 +2488,571 @@ Provide analysis in JSON format:
             ]
         }
 
-# Initialize S3 Logs Analyzer
-s3_analyzer = S3LogsAnalyzer(s3_client, bedrock) if s3_client and bedrock else None
+class AnalysisJobQueue:
+    """Bounded background executor for pipeline analyses
+    
+    Jobs for the same (project, pipeline) that are still queued or running
+    are de-duplicated: submitting again returns the in-flight job. A job is
+    a steps generator: the (event, payload) pairs it yields are kept as the
+    job's progress events, and ("done", result) sets its result.
+    """
+
+    def __init__(self, workers=ANALYSIS_WORKERS, max_pending=ANALYSIS_QUEUE_MAX,
+                 job_ttl=ANALYSIS_JOB_TTL, history=ANALYSIS_JOB_HISTORY):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.history = history
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="onedev-analysis")
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._futures = set()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def submit(self, key, func, *args, **meta):
+        """Queue the steps generator func(*args); return (job, created) or (None, False) when full or draining"""
+        with self._lock:
+            if self._closed:
+                self.rejected += 1
+                return None, False
+            self._prune()
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                self.deduplicated += 1
+                return self._public(self._jobs[job_id]), False
+            
+            if len(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                return None, False
+            
+            job = dict(meta)
+            job.update({
+                "id": uuid.uuid4().hex,
+                "status": "queued",
+                "submitted_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "_events": []
+            })
+            self._jobs[job["id"]] = job
+            self._inflight[key] = job["id"]
+            self.submitted += 1
+        
+        # The job logs under the correlation ID of the request that queued it
+        future = self.executor.submit(in_current_context(self._run), key, job["id"], func, args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return self._public(job), True
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def drain(self, timeout):
+        """Refuse new jobs and wait up to timeout for queued and running ones; True if all finished"""
+        with self._lock:
+            self._closed = True
+            futures = list(self._futures)
+        _, pending = wait(futures, timeout=timeout)
+        # Anything still queued after the deadline is dropped rather than started
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        return not pending
+
+    def _run(self, key, job_id, func, args):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+        result, error = None, None
+        try:
+            for event, payload in func(*args):
+                if event == "done":
+                    result = payload
+                    continue
+                with self._changed:
+                    job["_events"].append((event, payload))
+                    self._changed.notify_all()
+        except Exception as e:
+            logger.error("Analysis job %s failed: %s", job_id, e)
+            result, error = None, str(e)
+        with self._changed:
+            self._changed.notify_all()
+            job["status"] = "failed" if error else "completed"
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = datetime.now().isoformat()
+            job["_finished"] = time.monotonic()
+            if self._inflight.get(key) == job_id:
+                del self._inflight[key]
+
+    def _prune(self):
+        """Forget finished jobs past their TTL or beyond the history bound (lock held)"""
+        now = time.monotonic()
+        finished = [job_id for job_id, job in self._jobs.items() if "_finished" in job]
+        overflow = max(len(finished) - self.history, 0)
+        for index, job_id in enumerate(finished):
+            if index < overflow or now - self._jobs[job_id]["_finished"] > self.job_ttl:
+                del self._jobs[job_id]
+
+    @staticmethod
+    def _public(job, include_result=False):
+        public = {k: v for k, v in job.items() if not k.startswith("_") and k != "result"}
+        if include_result:
+            public["result"] = job["result"]
+        return public
+
+    def wait_events(self, job_id, cursor, timeout):
+        """Progress events after cursor, waiting up to timeout for one; returns (events, job) or ([], None)"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return [], None
+            if len(job["_events"]) <= cursor and "_finished" not in job:
+                self._changed.wait(timeout)
+            return job["_events"][cursor:], self._public(job, include_result=True)
+
+    def get(self, job_id, include_result=False):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job, include_result) if job else None
+
+    def stats(self):
+        with self._lock:
+            statuses = [job["status"] for job in self._jobs.values()]
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+                "completed": statuses.count("completed"),
+                "failed": statuses.count("failed"),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected
+            }
+
+class HealthMonitor:
+    """Runs upstream probes on a background schedule and keeps their last result
+
+    /api/health only reads this snapshot, so it never waits on an upstream.
+    A probe still running from the previous round is not started again.
+    Until its first result arrives a probe reports "starting".
+    """
+
+    def __init__(self, probes, interval=HEALTH_PROBE_INTERVAL, timeout=HEALTH_PROBE_TIMEOUT,
+                 stale_after=HEALTH_PROBE_STALE_AFTER):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(probes)), thread_name_prefix="onedev-health")
+        self._results = {
+            name: {"status": "starting", "latency_ms": None, "checked_at": None, "error": None}
+            for name in probes
+        }
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the scheduler thread if it is not running (cheap enough to call on every request)"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="onedev-health-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        """Probe every upstream in parallel, waiting at most timeout for the round"""
+        futures = {}
+        for name, probe in self.probes.items():
+            with self._lock:
+                if name in self._running:
+                    continue
+                self._running.add(name)
+            futures[name] = self.executor.submit(self._probe, name, probe)
+        wait(futures.values(), timeout=self.timeout)
+        for name, future in futures.items():
+            if not future.done():
+                # Reported down now; the late answer still replaces this when it arrives
+                self._record(name, "down", self.timeout, f"No answer within {self.timeout}s", {})
+
+    def _probe(self, name, probe):
+        started = time.monotonic()
+        try:
+            details, error = probe() or {}, None
+            status = details.pop("status", "up")
+        except Exception as e:
+            details, status, error = {}, "down", str(e)
+        finally:
+            with self._lock:
+                self._running.discard(name)
+        self._record(name, status, time.monotonic() - started, error, details)
+
+    def _record(self, name, status, elapsed, error, details):
+        result = {
+            "status": status,
+            "latency_ms": round(elapsed * 1000, 1),
+            "checked_at": datetime.now().isoformat(),
+            "error": error,
+            "_checked": time.monotonic()
+        }
+        result.update(details)
+        with self._lock:
+            previous = self._results[name]["status"]
+            self._results[name] = result
+        if status in ("up", "demo") and previous != status:
+            logger.info("Health probe %s: %s -> %s", name, previous, status, extra={"latency_ms": result["latency_ms"]})
+        elif previous != status:
+            logger.warning("Health probe %s: %s -> %s", name, previous, status, extra={"error": error})
+
+    def snapshot(self):
+        """Last result per upstream, marked "stale" once older than stale_after"""
+        now = time.monotonic()
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+        for result in results.values():
+            checked = result.pop("_checked", None)
+            result["age_seconds"] = round(now - checked, 1) if checked is not None else None
+            if checked is not None and now - checked > self.stale_after:
+                result["status"] = "stale"
+        return results
+
+class AWSServices:
+    """Thread-safe, build-once provider of the boto3 clients, Bedrock gateway and S3 analyzer
+
+    boto3 is imported and the clients are created on first access, so a
+    worker that only serves auth, YML generation or the frontend never
+    pays for them. If that fails every attribute stays None and callers
+    fall back to demo data.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._ready = False
+        self._bedrock = None
+        self._s3 = None
+        self._gateway = None
+        self._analyzer = None
+
+    @property
+    def initialized(self):
+        """True once the clients were built (or failed to build); reading it never builds them"""
+        return self._ready
+
+    def _ensure(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            try:
+                import boto3
+                from botocore.config import Config as BotoConfig
+                bedrock = boto3.client(
+                    'bedrock-runtime',
+                    region_name=AWS_REGION,
+                    # Retries are handled by BedrockGateway (jittered, breaker-aware)
+                    config=BotoConfig(retries={"mode": "standard", "max_attempts": 1}, max_pool_connections=max(10, BEDROCK_MAX_CONCURRENCY))
+                )
+                s3 = boto3.client(
+                    's3',
+                    region_name=AWS_REGION,
+                    config=BotoConfig(max_pool_connections=max(10, S3_FETCH_CONCURRENCY * 2))
+                )
+                logger.info("AWS Bedrock + S3 clients ready", extra={"region": AWS_REGION})
+            except Exception as e:
+                logger.warning("AWS Bedrock/S3 not available: %s", e)
+            else:
+                self._bedrock, self._s3 = bedrock, s3
+                self._gateway = BedrockGateway(
+                    bedrock,
+                    rate_limiter=RateLimiter(BEDROCK_RATE_LIMIT / WORKER_PROCESSES, BEDROCK_RATE_BURST // WORKER_PROCESSES),
+                    max_concurrency=BEDROCK_MAX_CONCURRENCY // WORKER_PROCESSES
+                )
+                self._analyzer = S3LogsAnalyzer(s3, self._gateway, cache=self.cache)
+            self._ready = True
+
+    @property
+    def bedrock(self):
+        self._ensure()
+        return self._bedrock
 
-def generate_enhanced_yml_with_s3_logs(tools, python_version="3.11"):
-    """Generate GitLab CI YML with S3 logs upload after each stage"""
+    @property
+    def s3(self):
+        self._ensure()
+        return self._s3
+
+    @property
+    def gateway(self):
+        self._ensure()
+        return self._gateway
+
+    @property
+    def analyzer(self):
+        self._ensure()
+        return self._analyzer
+
+# Initialize S3 Logs Analyzer (AWS clients are built on first use)
+analysis_cache = AnalysisCache()
+aws = AWSServices(cache=analysis_cache)
+analysis_jobs = AnalysisJobQueue()
+
+# Rendered PDF reports, keyed by analysis content hash (the ETag)
+report_cache = ReportCache()
+report_index = TTLCache(PDF_CACHE_MAX_ENTRIES, PDF_REPORT_INDEX_TTL)
+
+def probe_gitlab():
+    """GitLab /version; unauthenticated, so a 401 still proves the API is answering"""
+    response = gitlab_http.session.get(f"{GITLAB_BASE_URL}/api/v4/version", timeout=HEALTH_PROBE_TIMEOUT)
+    response.close()
+    if response.status_code >= 500:
+        raise RuntimeError(f"GitLab returned HTTP {response.status_code}")
+    return {"http_status": response.status_code}
+
+def probe_s3():
+    """HEAD the logs bucket: checks reachability, credentials and bucket access in one call
+
+    Until an analysis has built the AWS clients, an unsigned HEAD stands in
+    (403 still proves the endpoint and bucket answer), so a worker that
+    never analyzes does not import boto3 just to be probed.
+    """
+    if not aws.initialized:
+        response = requests.head(f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com", timeout=HEALTH_PROBE_TIMEOUT)
+        response.close()
+        if response.status_code == 404 or response.status_code >= 500:
+            raise RuntimeError(f"S3 bucket {S3_BUCKET_NAME} returned HTTP {response.status_code}")
+        return {"bucket": S3_BUCKET_NAME, "http_status": response.status_code, "clients": "not_loaded"}
+    if aws.s3 is None:
+        return {"status": "demo"}
+    aws.s3.head_bucket(Bucket=S3_BUCKET_NAME)
+    return {"bucket": S3_BUCKET_NAME}
+
+def probe_bedrock():
+    """Reach the bedrock-runtime endpoint without invoking (and paying for) the model
+
+    Any HTTP answer means the endpoint is reachable; the gateway's breaker
+    state tells whether recent model calls have been failing. Before the
+    AWS clients exist the regional endpoint is probed without building them.
+    """
+    if not aws.initialized:
+        endpoint_url, extra = f"https://bedrock-runtime.{AWS_REGION}.amazonaws.com", {"clients": "not_loaded"}
+    elif aws.bedrock is None:
+        return {"status": "demo"}
+    else:
+        endpoint_url, extra = aws.bedrock.meta.endpoint_url, {"breaker": aws.gateway.stats()["state"]}
+    response = requests.get(endpoint_url, timeout=HEALTH_PROBE_TIMEOUT)
+    response.close()
+    if response.status_code >= 500:
+        raise RuntimeError(f"Bedrock endpoint returned HTTP {response.status_code}")
+    return dict(extra, http_status=response.status_code)
+
+# Background upstream probes, started with the first request in the serving
+# process; they never build the AWS clients themselves
+health_monitor = HealthMonitor({"gitlab": probe_gitlab, "s3": probe_s3, "bedrock": probe_bedrock})
+
+@app.before_request
+def start_health_monitor():
+    health_monitor.start()
+
+def canonical_tool_selection(tools):
+    """Canonical, hashable form of the tool selection that affects .gitlab-ci.yml
     
-    config = {
-        "image": f"python:{python_version}",
-        "stages": ["test", "upload-logs", "deploy"],
-        "variables": {
-            "PIP_CACHE_DIR": "$CI_PROJECT_DIR/.cache/pip",
-            "AWS_DEFAULT_REGION": AWS_REGION,
-            "S3_BUCKET": S3_BUCKET_NAME,
-            "LOGS_PREFIX": "projects/$CI_PROJECT_NAME/pipelines/$CI_PIPELINE_ID"
-        },
-        "cache": {
-            "paths": [".cache/pip", "venv/"]
-        },
-        "before_script": [
-            f"python{python_version} -V",
-            "pip install virtualenv",
-            "virtualenv venv",
+    Only the categories the generator reads are kept; tool order and
+    duplicates do not change the output, so they are normalized away.
+    """
+    return tuple(
+        (category, tuple(sorted(set(tools[category] or []))))
+        for category in YML_TOOL_CATEGORIES
+        if category in tools
+    )
+
+def _build_unit_tests_job(unit_tools, pytest_workers=None):
+    job = {
+        "stage": "test",
+        "script": [
             "source venv/bin/activate",
-            "[ -f requirements.txt ] && pip install -r requirements.txt || echo 'No requirements.txt found'"
+            "mkdir -p logs/unit-tests",
+            "echo 'Starting Unit Tests...' > logs/unit-tests/unit-tests.log",
+            "echo 'Pipeline ID: '$CI_PIPELINE_ID >> logs/unit-tests/unit-tests.log",
+            "echo 'Project: '$CI_PROJECT_NAME >> logs/unit-tests/unit-tests.log",
+            "echo 'Commit: '$CI_COMMIT_SHA >> logs/unit-tests/unit-tests.log",
+            "echo 'Timestamp: '$(date -Iseconds) >> logs/unit-tests/unit-tests.log",
+            "echo 'Group: TechopsOneDev' >> logs/unit-tests/unit-tests.log",
+            "echo '---' >> logs/unit-tests/unit-tests.log"
         ],
-        "default": {
-            "tags": ["docker", "linux"]
+        "after_script": [
+            "# Upload unit tests logs to S3",
+            "echo 'Uploading unit tests logs to S3...'",
+            "aws s3 cp logs/unit-tests/ s3://$S3_BUCKET/$LOGS_PREFIX/unit-tests/ --recursive --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'"
+        ],
+        "artifacts": {
+            "when": "always",
+            "expire_in": "1 week",
+            "paths": ["logs/unit-tests/"]
         }
     }
     
-    test_jobs = []
+    if "pytest" in unit_tools:
+        # One pytest run writes junit, HTML and coverage reports together
+        parallel = f" -n {pytest_workers}" if pytest_workers else ""
+        job["script"].extend([
+            "if [ -d 'tests' ] || [ -d 'test' ]; then",
+            "  echo 'Running pytest...' >> logs/unit-tests/unit-tests.log",
+            "  python -m pytest --version || pip install pytest pytest-cov pytest-html"
+        ])
+        if pytest_workers:
+            job["script"].append("  python -c 'import xdist' 2>/dev/null || pip install pytest-xdist")
+        job["script"].extend([
+            f"  python -m pytest -v{parallel} --junitxml=logs/unit-tests/pytest-junit.xml --html=logs/unit-tests/pytest-report.html --self-contained-html --cov=. --cov-report=html:logs/unit-tests/coverage --cov-report=xml:logs/unit-tests/coverage.xml >> logs/unit-tests/unit-tests.log 2>&1 || true",
+            "else",
+            "  echo 'No tests directory found' >> logs/unit-tests/unit-tests.log",
+            "fi"
+        ])
+        
+    if "unittest" in unit_tools:
+        job["script"].extend([
+            "if [ -d 'tests' ] || [ -d 'test' ]; then",
+            "  echo 'Running unittest...' >> logs/unit-tests/unit-tests.log",
+            "  python -m unittest discover -s . -p 'test*.py' -v >> logs/unit-tests/unit-tests.log 2>&1 || true",
+            "else",
+            "  echo 'No unittest tests found' >> logs/unit-tests/unit-tests.log",
+            "fi"
+        ])
+    
+    return job
+
+def _install_missing_tools(packages):
+    # The keyed cache's venv (or the tools image) already has them: install only on a miss
+    present = " && ".join(f"command -v {package} >/dev/null" for package in packages)
+    return f"{present} || pip install {' '.join(packages)}"
+
+def _build_code_quality_job(quality_tools):
+    job = {
+        "stage": "test",
+        "script": [
+            "source venv/bin/activate",
+            "mkdir -p logs/code-quality",
+            "echo 'Starting Code Quality Analysis...' > logs/code-quality/quality.log",
+            "echo 'Pipeline ID: '$CI_PIPELINE_ID >> logs/code-quality/quality.log",
+            "echo 'Project: '$CI_PROJECT_NAME >> logs/code-quality/quality.log",
+            "echo 'Group: TechopsOneDev' >> logs/code-quality/quality.log",
+            "echo 'Timestamp: '$(date -Iseconds) >> logs/code-quality/quality.log",
+            "echo '---' >> logs/code-quality/quality.log"
+        ],
+        "after_script": [
+            "# Upload code quality logs to S3",
+            "echo 'Uploading code quality logs to S3...'",
+            "aws s3 cp logs/code-quality/ s3://$S3_BUCKET/$LOGS_PREFIX/code-quality/ --recursive --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'"
+        ],
+        "artifacts": {
+            "when": "always",
+            "expire_in": "1 week",
+            "paths": ["logs/code-quality/"]
+        },
+        "allow_failure": True
+    }
     
-    # Unit Tests with S3 Upload
-    if "Unit Tests" in tools:
-        unit_tools = tools["Unit Tests"]
-        config["unit_tests"] = {
-            "stage": "test",
-            "script": [
-                "source venv/bin/activate",
-                "mkdir -p logs/unit-tests",
-                "echo 'Starting Unit Tests...' > logs/unit-tests/unit-tests.log",
-                "echo 'Pipeline ID: '$CI_PIPELINE_ID >> logs/unit-tests/unit-tests.log",
-                "echo 'Project: '$CI_PROJECT_NAME >> logs/unit-tests/unit-tests.log",
-                "echo 'Commit: '$CI_COMMIT_SHA >> logs/unit-tests/unit-tests.log",
-                "echo 'Timestamp: '$(date -Iseconds) >> logs/unit-tests/unit-tests.log",
-                "echo 'Group: TechopsOneDev' >> logs/unit-tests/unit-tests.log",
-                "echo '---' >> logs/unit-tests/unit-tests.log"
-            ],
-            "after_script": [
-                "# Upload unit tests logs to S3",
-                "echo 'Uploading unit tests logs to S3...'",
-                "aws s3 cp logs/unit-tests/ s3://$S3_BUCKET/$LOGS_PREFIX/unit-tests/ --recursive --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'"
-            ],
-            "artifacts": {
-                "when": "always",
-                "expire_in": "1 week",
-                "paths": ["logs/unit-tests/"]
-            }
-        }
-        
-        if "pytest" in unit_tools:
-            config["unit_tests"]["script"].extend([
-                "if [ -d 'tests' ] || [ -d 'test' ]; then",
-                "  echo 'Running pytest...' >> logs/unit-tests/unit-tests.log",
-                "  python -m pytest --version || pip install pytest pytest-cov pytest-html",
-                "  python -m pytest -v --junitxml=logs/unit-tests/pytest-junit.xml --html=logs/unit-tests/pytest-report.html --self-contained-html >> logs/unit-tests/unit-tests.log 2>&1 || true",
-                "  python -m pytest --cov=. --cov-report=html:logs/unit-tests/coverage --cov-report=xml:logs/unit-tests/coverage.xml >> logs/unit-tests/unit-tests.log 2>&1 || true",
-                "else",
-                "  echo 'No tests directory found' >> logs/unit-tests/unit-tests.log",
-                "fi"
-            ])
-            
-        if "unittest" in unit_tools:
-            config["unit_tests"]["script"].extend([
-                "if [ -d 'tests' ] || [ -d 'test' ]; then",
-                "  echo 'Running unittest...' >> logs/unit-tests/unit-tests.log",
-                "  python -m unittest discover -s . -p 'test*.py' -v >> logs/unit-tests/unit-tests.log 2>&1 || true",
-                "else",
-                "  echo 'No unittest tests found' >> logs/unit-tests/unit-tests.log",
-                "fi"
-            ])
+    lint_packages = []
+    if "pylint" in quality_tools:
+        lint_packages.append("pylint")
+        # One pylint run: text report to the log, JSON report to pylint.json
+        job["script"].extend([
+            "echo 'Running pylint...' >> logs/code-quality/quality.log",
+            "PY_FILES=$(find . -name '*.py' -not -path './venv/*')",
+            "if [ -n \"$PY_FILES\" ]; then pylint $PY_FILES --output-format=text,json:logs/code-quality/pylint.json >> logs/code-quality/quality.log 2>&1 || true; else echo 'No Python files found for pylint' >> logs/code-quality/quality.log; fi"
+        ])
         
-        test_jobs.append("unit_tests")
-    
-    # Code Quality with S3 Upload
-    if "Code Quality" in tools:
-        quality_tools = tools["Code Quality"]
-        config["code_quality"] = {
-            "stage": "test",
-            "script": [
-                "source venv/bin/activate",
-                "mkdir -p logs/code-quality",
-                "echo 'Starting Code Quality Analysis...' > logs/code-quality/quality.log",
-                "echo 'Pipeline ID: '$CI_PIPELINE_ID >> logs/code-quality/quality.log",
-                "echo 'Project: '$CI_PROJECT_NAME >> logs/code-quality/quality.log",
-                "echo 'Group: TechopsOneDev' >> logs/code-quality/quality.log",
-                "echo 'Timestamp: '$(date -Iseconds) >> logs/code-quality/quality.log",
-                "echo '---' >> logs/code-quality/quality.log"
-            ],
-            "after_script": [
-                "# Upload code quality logs to S3",
-                "echo 'Uploading code quality logs to S3...'",
-                "aws s3 cp logs/code-quality/ s3://$S3_BUCKET/$LOGS_PREFIX/code-quality/ --recursive --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'"
-            ],
-            "artifacts": {
-                "when": "always",
-                "expire_in": "1 week",
-                "paths": ["logs/code-quality/"]
-            },
-            "allow_failure": True
-        }
+    if "flake8" in quality_tools:
+        lint_packages.append("flake8")
+        job["script"].extend([
+            "echo 'Running flake8...' >> logs/code-quality/quality.log",
+            "flake8 . --exclude=venv,.venv >> logs/code-quality/quality.log 2>&1 || true"
+        ])
         
-        lint_packages = []
-        if "pylint" in quality_tools:
-            lint_packages.append("pylint")
-            config["code_quality"]["script"].extend([
-                "echo 'Running pylint...' >> logs/code-quality/quality.log",
-                "find . -name '*.py' -not -path './venv/*' | head -1 > /dev/null && (",
-                "  pylint $(find . -name '*.py' -not -path './venv/*') --output-format=text >> logs/code-quality/quality.log 2>&1 || true",
-                "  pylint $(find . -name '*.py' -not -path './venv/*') --output-format=json > logs/code-quality/pylint.json 2>&1 || true",
-                ") || echo 'No Python files found for pylint' >> logs/code-quality/quality.log"
-            ])
-            
-        if "flake8" in quality_tools:
-            lint_packages.append("flake8")
-            config["code_quality"]["script"].extend([
-                "echo 'Running flake8...' >> logs/code-quality/quality.log",
-                "flake8 . --exclude=venv,.venv >> logs/code-quality/quality.log 2>&1 || true"
-            ])
-            
-        if "mypy" in quality_tools:
-            lint_packages.append("mypy")
-            config["code_quality"]["script"].extend([
-                "echo 'Running mypy...' >> logs/code-quality/quality.log",
-                "mypy . --exclude 'venv|.venv' >> logs/code-quality/quality.log 2>&1 || true"
-            ])
-            
-        if lint_packages:
-            config["code_quality"]["script"].insert(6, f"pip install {' '.join(lint_packages)}")
+    if "mypy" in quality_tools:
+        lint_packages.append("mypy")
+        job["script"].extend([
+            "echo 'Running mypy...' >> logs/code-quality/quality.log",
+            "mypy . --exclude 'venv|.venv' >> logs/code-quality/quality.log 2>&1 || true"
+        ])
         
-        test_jobs.append("code_quality")
+    if lint_packages:
+        job["script"].insert(6, _install_missing_tools(lint_packages))
     
-    # Security with S3 Upload
-    if "Security" in tools:
-        security_tools = tools["Security"]
-        config["security_scan"] = {
-            "stage": "test",
-            "script": [
-                "source venv/bin/activate",
-                "mkdir -p logs/security",
-                "echo 'Starting Security Scan...' > logs/security/security.log",
-                "echo 'Pipeline ID: '$CI_PIPELINE_ID >> logs/security/security.log",
-                "echo 'Project: '$CI_PROJECT_NAME >> logs/security/security.log",
-                "echo 'Group: TechopsOneDev' >> logs/security/security.log",
-                "echo 'Timestamp: '$(date -Iseconds) >> logs/security/security.log",
-                "echo '---' >> logs/security/security.log"
-            ],
-            "after_script": [
-                "# Upload security logs to S3",
-                "echo 'Uploading security logs to S3...'",
-                "aws s3 cp logs/security/ s3://$S3_BUCKET/$LOGS_PREFIX/security/ --recursive --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'"
-            ],
-            "artifacts": {
-                "when": "always",
-                "expire_in": "1 week",
-                "paths": ["logs/security/"]
-            },
-            "allow_failure": True
-        }
+    return job
+
+def _build_security_scan_job(security_tools):
+    job = {
+        "stage": "test",
+        "script": [
+            "source venv/bin/activate",
+            "mkdir -p logs/security",
+            "echo 'Starting Security Scan...' > logs/security/security.log",
+            "echo 'Pipeline ID: '$CI_PIPELINE_ID >> logs/security/security.log",
+            "echo 'Project: '$CI_PROJECT_NAME >> logs/security/security.log",
+            "echo 'Group: TechopsOneDev' >> logs/security/security.log",
+            "echo 'Timestamp: '$(date -Iseconds) >> logs/security/security.log",
+            "echo '---' >> logs/security/security.log"
+        ],
+        "after_script": [
+            "# Upload security logs to S3",
+            "echo 'Uploading security logs to S3...'",
+            "aws s3 cp logs/security/ s3://$S3_BUCKET/$LOGS_PREFIX/security/ --recursive --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'"
+        ],
+        "artifacts": {
+            "when": "always",
+            "expire_in": "1 week",
+            "paths": ["logs/security/"]
+        },
+        "allow_failure": True
+    }
+    
+    security_packages = []
+    if "bandit" in security_tools:
+        security_packages.append("bandit")
+        # One scan: the JSON report is written to bandit.json and copied into the log
+        job["script"].extend([
+            "echo 'Running bandit security scan...' >> logs/security/security.log",
+            "bandit -r . -x './venv/*' -f json 2>> logs/security/security.log | tee logs/security/bandit.json >> logs/security/security.log || true"
+        ])
         
-        security_packages = []
-        if "bandit" in security_tools:
-            security_packages.append("bandit")
-            config["security_scan"]["script"].extend([
-                "echo 'Running bandit security scan...' >> logs/security/security.log",
-                "bandit -r . -x './venv/*' -f txt >> logs/security/security.log 2>&1 || true",
-                "bandit -r . -x './venv/*' -f json > logs/security/bandit.json 2>&1 || true"
-            ])
-            
-        if "safety" in security_tools:
-            security_packages.append("safety")
-            config["security_scan"]["script"].extend([
-                "echo 'Running safety check...' >> logs/security/security.log",
-                "safety check >> logs/security/security.log 2>&1 || true",
-                "safety check --json > logs/security/safety.json 2>&1 || true"
-            ])
-            
-        if security_packages:
-            config["security_scan"]["script"].insert(6, f"pip install {' '.join(security_packages)}")
+    if "safety" in security_tools:
+        security_packages.append("safety")
+        job["script"].extend([
+            "echo 'Running safety check...' >> logs/security/security.log",
+            "safety check --json 2>> logs/security/security.log | tee logs/security/safety.json >> logs/security/security.log || true"
+        ])
         
-        test_jobs.append("security_scan")
+    if security_packages:
+        job["script"].insert(6, _install_missing_tools(security_packages))
     
+    return job
+
+def _build_upload_all_logs_job(test_jobs, skip_setup=False):
     # Consolidate all logs and upload to S3
-    config["upload_all_logs"] = {
+    job = {
         "stage": "upload-logs",
         "image": "amazon/aws-cli:latest",
         "script": [
@@ -699,7 +3071,7 @@ def generate_enhanced_yml_with_s3_logs(tools, python_version="3.11"):
             "aws s3 sync consolidated-logs/ s3://$S3_BUCKET/$LOGS_PREFIX/consolidated/ --region $AWS_DEFAULT_REGION || echo 'S3 upload failed'",
             "echo 'All logs uploaded to S3 for AI analysis'"
         ],
-        "dependencies": test_jobs,
+        "dependencies": list(test_jobs),
         "when": "always",
         "artifacts": {
             "when": "always",
@@ -708,8 +3080,16 @@ def generate_enhanced_yml_with_s3_logs(tools, python_version="3.11"):
         }
     }
     
+    if skip_setup:
+        # Runs on the aws-cli image: no Python venv or dependency cache needed
+        job["before_script"] = []
+        job["cache"] = []
+    
+    return job
+
+def _build_deploy_production_job(skip_setup=False):
     # Manual Production Deploy
-    config["deploy_production"] = {
+    job = {
         "stage": "deploy",
         "when": "manual",
         "only": ["main"],
@@ -730,18 +3110,202 @@ def generate_enhanced_yml_with_s3_logs(tools, python_version="3.11"):
         }
     }
     
-    # Generate summary
-    tools_count = sum(len(tool_list) for tool_list in tools.values())
-    jobs_created = test_jobs + ["upload_all_logs", "deploy_production"]
+    if skip_setup:
+        job["before_script"] = []
+        job["cache"] = []
+    
+    return job
+
+def _dependency_cache(python_version, policy):
+    """Cache keyed on requirements.txt content and the Python version"""
+    return {
+        "key": {
+            "files": ["requirements.txt"],
+            "prefix": f"py{python_version}"
+        },
+        "paths": [".cache/pip", "venv/"],
+        "policy": policy
+    }
+
+def _build_prepare_venv_job(python_version, packages, tools_image=None):
+    # Populate the keyed dependency cache once; test jobs only pull it
+    script = []
+    if packages and not tools_image:
+        script.append(f"pip install {' '.join(packages)}")
+    script.append("echo 'Dependencies ready in venv/'")
+    return {
+        "stage": "prepare",
+        "script": script,
+        "cache": _dependency_cache(python_version, "pull-push")
+    }
+
+def _build_global_config(python_version, dependency_cache="shared", tools_image=None):
+    if dependency_cache != "keyed":
+        return {
+            "image": f"python:{python_version}",
+            "stages": ["test", "upload-logs", "deploy"],
+            "variables": {
+                "PIP_CACHE_DIR": "$CI_PROJECT_DIR/.cache/pip",
+                "AWS_DEFAULT_REGION": AWS_REGION,
+                "S3_BUCKET": S3_BUCKET_NAME,
+                "LOGS_PREFIX": "projects/$CI_PROJECT_NAME/pipelines/$CI_PIPELINE_ID"
+            },
+            "cache": {
+                "paths": [".cache/pip", "venv/"]
+            },
+            "before_script": [
+                f"python{python_version} -V",
+                "pip install virtualenv",
+                "virtualenv venv",
+                "source venv/bin/activate",
+                "[ -f requirements.txt ] && pip install -r requirements.txt || echo 'No requirements.txt found'"
+            ],
+            "default": {
+                "tags": ["docker", "linux"]
+            }
+        }
+    
+    # Reuse the venv restored from cache; only build it on a cache miss
+    if tools_image:
+        create_venv = "[ -x venv/bin/python ] || python -m venv --system-site-packages venv"
+    else:
+        create_venv = "[ -x venv/bin/python ] || { pip install virtualenv && virtualenv venv; }"
+    
+    return {
+        "image": tools_image or f"python:{python_version}",
+        "stages": ["prepare", "test", "upload-logs", "deploy"],
+        "variables": {
+            "PIP_CACHE_DIR": "$CI_PROJECT_DIR/.cache/pip",
+            "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+            "AWS_DEFAULT_REGION": AWS_REGION,
+            "S3_BUCKET": S3_BUCKET_NAME,
+            "LOGS_PREFIX": "projects/$CI_PROJECT_NAME/pipelines/$CI_PIPELINE_ID"
+        },
+        "cache": _dependency_cache(python_version, "pull"),
+        "before_script": [
+            f"python{python_version} -V",
+            create_venv,
+            "source venv/bin/activate",
+            "[ -f requirements.txt ] && pip install -r requirements.txt || echo 'No requirements.txt found'"
+        ],
+        "default": {
+            "tags": ["docker", "linux"]
+        }
+    }
+
+def _dump_yml(config):
+    return yaml.dump(config, Dumper=YAML_DUMPER, default_flow_style=False)
+
+@lru_cache(maxsize=YML_CACHE_SIZE)
+def _yml_fragments(fragment, *args, **options):
+    """Precompiled YAML text for one top-level key (or the global keys) of the pipeline
+    
+    yaml.dump emits top-level keys sorted and independently, so the dumps of
+    single-key mappings concatenate to exactly the dump of the whole config.
+    """
+    if fragment == "global":
+        config = _build_global_config(*args, **options)
+    else:
+        builders = {
+            "prepare_venv": _build_prepare_venv_job,
+            "unit_tests": _build_unit_tests_job,
+            "code_quality": _build_code_quality_job,
+            "security_scan": _build_security_scan_job,
+            "upload_all_logs": _build_upload_all_logs_job,
+            "deploy_production": _build_deploy_production_job
+        }
+        config = {fragment: builders[fragment](*args, **options)}
+    return {key: _dump_yml({key: value}) for key, value in config.items()}
+
+@lru_cache(maxsize=YML_CACHE_SIZE)
+def _compose_yml(selection, python_version, dependency_cache, tools_image, pytest_workers):
+    selected = dict(selection)
+    keyed = dependency_cache == "keyed"
+    
+    if keyed:
+        fragments = dict(_yml_fragments("global", python_version, dependency_cache="keyed", tools_image=tools_image))
+        packages = tuple(
+            package
+            for tool_list in selected.values()
+            for tool in tool_list
+            for package in YML_TOOL_PACKAGES.get(tool, [])
+        )
+        if pytest_workers and "pytest" in selected.get("Unit Tests", ()):
+            packages += ("pytest-xdist",)
+        fragments.update(_yml_fragments("prepare_venv", python_version, packages, tools_image=tools_image))
+    else:
+        fragments = dict(_yml_fragments("global", python_version))
+    
+    test_jobs = []
+    for category, job_name in YML_TOOL_CATEGORIES.items():
+        if category in selected:
+            if job_name == "unit_tests" and pytest_workers:
+                fragments.update(_yml_fragments(job_name, selected[category], pytest_workers=pytest_workers))
+            else:
+                fragments.update(_yml_fragments(job_name, selected[category]))
+            test_jobs.append(job_name)
+    
+    if keyed:
+        fragments.update(_yml_fragments("upload_all_logs", tuple(test_jobs), skip_setup=True))
+        fragments.update(_yml_fragments("deploy_production", skip_setup=True))
+    else:
+        fragments.update(_yml_fragments("upload_all_logs", tuple(test_jobs)))
+        fragments.update(_yml_fragments("deploy_production"))
+    
+    jobs_created = (["prepare_venv"] if keyed else []) + test_jobs + ["upload_all_logs", "deploy_production"]
+    logger.debug(
+        "Generated enhanced CI/CD pipeline",
+        extra={
+            "jobs": jobs_created,
+            "tools": sum(len(tool_list) for tool_list in selected.values()),
+            "dependency_cache": dependency_cache,
+            "tools_image": tools_image
+        }
+    )
+    
+    return "".join(fragments[key] for key in sorted(fragments))
+
+def generate_enhanced_yml_with_s3_logs(tools, python_version="3.11",
+                                       dependency_cache=YML_DEPENDENCY_CACHE, tools_image=YML_TOOLS_IMAGE,
+                                       pytest_workers=YML_PYTEST_WORKERS):
+    """Generate GitLab CI YML with S3 logs upload after each stage
+    
+    With dependency_cache="keyed", a prepare_venv job builds the venv and
+    tool packages once into a cache keyed on requirements.txt and the
+    Python version; every other job only pulls it. tools_image swaps in a
+    prebuilt image whose tools are reused through --system-site-packages.
     
-    print(f"Generated enhanced CI/CD pipeline:")
-    print(f"  Jobs: {', '.join(jobs_created)}")
-    print(f"  Tools: {tools_count} selected tools")
-    print(f"  Group: TechopsOneDev")
-    print(f"  S3 Integration: Enabled")
-    print(f"  Deploy: Manual (Professional workflow)")
+    pytest_workers ("auto" or a count) runs the single pytest pass under
+    pytest-xdist.
     
-    return yaml.dump(config, default_flow_style=False)
+    Memoized on the canonical tool selection and options: repeat
+    selections are served from the cache without rebuilding or dumping.
+    """
+    if dependency_cache not in ("keyed", "shared"):
+        raise ValueError(f"Unknown dependency_cache mode: {dependency_cache}")
+    if pytest_workers and str(pytest_workers) != "auto" and not str(pytest_workers).isdigit():
+        raise ValueError(f"pytest_workers must be 'auto' or a positive integer, not {pytest_workers!r}")
+    return _compose_yml(
+        canonical_tool_selection(tools),
+        str(python_version),
+        dependency_cache,
+        tools_image or None,
+        str(pytest_workers) if pytest_workers else None
+    )
+
+def yml_cache_stats():
+    info = _compose_yml.cache_info()
+    fragments = _yml_fragments.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+        "fragments_cached": fragments.currsize,
+        "c_emitter": YAML_DUMPER.__name__.startswith("C")
+    }
 
 def generate_professional_readme(project_name, language, framework, tools):
     """Generate professional README for TechopsOneDev group"""
@@ -906,24 +3470,235 @@ For support with this OneDev-generated project:
     
     return readme_content
 
-def generate_pdf_report(analysis_data, project_name):
-    """Generate a professional PDF report"""
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+def yml_options_error(options):
+    """Error message for invalid .gitlab-ci.yml options in a request or project spec, else None
     
-    c = canvas.Canvas(temp_file.name, pagesize=letter)
+    Checked before anything is created in GitLab: generation runs after
+    the project exists, so a bad value there would leave it without CI.
+    """
+    if options.get('dependency_cache', YML_DEPENDENCY_CACHE) not in ("keyed", "shared"):
+        return "'dependency_cache' must be 'keyed' or 'shared'"
+    pytest_workers = options.get('pytest_workers', YML_PYTEST_WORKERS)
+    if pytest_workers and str(pytest_workers) != "auto" and not str(pytest_workers).isdigit():
+        return "'pytest_workers' must be 'auto' or a positive integer"
+    return None
+
+def provision_project_steps(gitlab, spec):
+    """Run the provisioning workflow for one project spec, yielding (event, payload) per step
     
-    # Header
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, 750, f"OneDev Analysis Report - {project_name}")
+    Steps default to create -> commit .gitlab-ci.yml/README -> trigger. A spec
+    may restrict them with "steps" (any of "create", "commit", "trigger",
+    "watch"); without "create" it must carry the existing "project_id".
+    "watch" follows the triggered pipeline until it reaches a final status
+    or "watch_timeout" seconds pass (PROVISION_WATCH_TIMEOUT by default).
+    While watching, ("heartbeat", None) marks polls with no status change.
+    The last event is always ("done", result).
+    """
+    project_name = spec.get('name')
+    branch = spec.get('branch', 'main')
+    language = spec.get('language', 'python')
+    framework = spec.get('framework')
+    tools = spec.get('tools', {})
+    python_version = spec.get('python_version', '3.11')
+    steps = spec.get('steps') or ["create", "commit", "trigger"]
+    if not spec.get('trigger', True) and "trigger" in steps:
+        steps = [step for step in steps if step not in ("trigger", "watch")]
+    started = time.monotonic()
+    result = {"name": project_name, "success": False}
     
-    c.setFont("Helvetica", 12)
-    c.drawString(50, 720, f"Generated on {datetime.now().strftime('%d/%m/%Y at %H:%M')}")
-    c.drawString(50, 700, "TechopsOneDev Group - Professional CI/CD Automation & AI Analysis")
+    try:
+        project_id = spec.get('project_id')
+        
+        if "create" in steps:
+            project = gitlab.create_project_only(project_name, branch)
+            project_id = project['id']
+            result["project"] = {
+                "id": project_id,
+                "name": project_name,
+                "clone_url": project.get('ssh_url_fixed', f"git@gitlab.com:{ONEDEV_GROUP_NAME}/{project_name}.git"),
+                "web_url": project.get('web_url_fixed', f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{project_name}"),
+                "mode": project.get('mode', 'live')
+            }
+            yield "created", result["project"]
+        elif project_id is None:
+            raise ValueError("project_id is required when the create step is skipped")
+        
+        if "commit" in steps:
+            files = {
+                ".gitlab-ci.yml": generate_enhanced_yml_with_s3_logs(
+                    tools,
+                    python_version=python_version,
+                    dependency_cache=spec.get('dependency_cache', YML_DEPENDENCY_CACHE),
+                    tools_image=spec.get('tools_image', YML_TOOLS_IMAGE),
+                    pytest_workers=spec.get('pytest_workers', YML_PYTEST_WORKERS)
+                ),
+                "README.md": generate_professional_readme(project_name, language, framework, tools)
+            }
+            commit = gitlab.commit_multiple_files(
+                project_id,
+                files,
+                "OneDev: Generated CI/CD pipeline for TechopsOneDev group with S3 logs integration"
+            )
+            result["commit"] = {"id": commit.get('id'), "files": list(files.keys())}
+            yield "committed", result["commit"]
+        
+        if "trigger" in steps:
+            pipeline = gitlab.trigger_pipeline(project_id, branch)
+            result["pipeline"] = {
+                "id": pipeline.get('id'),
+                "status": pipeline.get('status', 'running'),
+                "web_url": pipeline.get('web_url')
+            }
+            yield "pipeline_triggered", result["pipeline"]
+            
+            if "watch" in steps:
+                for status in watch_pipeline(gitlab, project_id, result["pipeline"]["id"], result["pipeline"]["status"],
+                                             timeout=spec.get('watch_timeout', PROVISION_WATCH_TIMEOUT)):
+                    if status is None:
+                        yield "heartbeat", None
+                        continue
+                    result["pipeline"]["status"] = status["status"]
+                    yield "pipeline_status", status
+        
+        result["success"] = True
+    except Exception as e:
+        logger.error("Provisioning error for %s: %s", project_name, e)
+        result["error"] = str(e)
+    
+    result["duration_seconds"] = round(time.monotonic() - started, 3)
+    yield "done", result
+
+def provision_project(gitlab, spec):
+    """Run create -> commit .gitlab-ci.yml/README -> trigger for one project spec"""
+    result = None
+    for event, payload in provision_project_steps(gitlab, spec):
+        if event == "done":
+            result = payload
+    return result
+
+def watch_pipeline(gitlab, project_id, pipeline_id, last_status=None,
+                   interval=PROVISION_WATCH_INTERVAL, timeout=PROVISION_WATCH_TIMEOUT,
+                   max_interval=PROVISION_WATCH_MAX_INTERVAL):
+    """Poll a GitLab pipeline, yielding its status each time it changes until it settles
+    
+    Polls where nothing changed yield None so streaming callers can send a heartbeat.
+    The wait between polls doubles up to max_interval while the status holds
+    and drops back to interval when it changes.
+    """
+    deadline = time.monotonic() + timeout
+    delay = interval
+    
+    while time.monotonic() < deadline:
+        pipeline = gitlab.get_pipeline(project_id, pipeline_id)
+        if pipeline is None:
+            yield {"id": pipeline_id, "status": "unknown", "final": True}
+            return
+        
+        status = pipeline.get('status', 'unknown')
+        final = status in PIPELINE_FINAL_STATUSES
+        if status != last_status or final:
+            last_status = status
+            delay = interval
+            yield {
+                "id": pipeline_id,
+                "status": status,
+                "web_url": pipeline.get('web_url'),
+                "final": final
+            }
+        else:
+            yield None
+        if final:
+            return
+        time.sleep(max(0, min(delay, deadline - time.monotonic())))
+        delay = min(delay * 2, max_interval)
+    
+    yield {"id": pipeline_id, "status": last_status, "final": False, "timed_out": True}
+
+def sse_event(event, payload):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def run_pipeline_analysis(project_id, project_name, pipeline_id, mode=None):
+    """Analyze a pipeline's S3 logs with Bedrock (demo data when AWS is unavailable)"""
+    for event, payload in pipeline_analysis_steps(project_id, project_name, pipeline_id, mode):
+        if event == "done":
+            return payload
+
+def pipeline_analysis_steps(project_id, project_name, pipeline_id, mode=None, stream=False):
+    """Yield ("suggestion", item) events as they arrive, then ("done", analysis)"""
+    logger.info("AI analysis started", extra={"project": project_name, "project_id": project_id, "pipeline_id": pipeline_id, "mode": mode})
+    
+    analyzer = aws.analyzer
+    if not analyzer:
+        logger.info("S3 analyzer not available, using demo data")
+        analysis = {
+            "pipeline_id": pipeline_id,
+            "stages_analyzed": ["unit-tests", "code-quality", "security", "deploy"],
+            "total_log_files": 12,
+            "tests_executed": 24,
+            "failures": 2,
+            "log_source": f"S3: s3://{S3_BUCKET_NAME}/projects/{project_name}/pipelines/{pipeline_id}",
+            "s3_location": f"s3://{S3_BUCKET_NAME}/projects/{project_name}/pipelines/{pipeline_id}",
+            "analysis_timestamp": datetime.now().isoformat(),
+            "group": "TechopsOneDev",
+            "suggestions": [
+                {"category": "Unit Tests", "recommendation": "Add more comprehensive test cases for edge scenarios"},
+                {"category": "Code Quality", "recommendation": "Address pylint warnings and improve code documentation"},
+                {"category": "Security", "recommendation": "Update dependencies and implement security best practices"},
+                {"category": "Deploy", "recommendation": "Add health checks and rollback procedures for deployments"},
+                {"category": "Performance", "recommendation": "Optimize application startup and resource usage"},
+                {"category": "TechopsOneDev", "recommendation": "Configure team-specific deployment workflows in TechopsOneDev group"}
+            ]
+        }
+    else:
+        # Analyze logs from S3 with Bedrock
+        for event, payload in analyzer.analysis_steps(project_name, pipeline_id, mode=mode, stream=stream):
+            if event == "done":
+                analysis = payload
+            else:
+                yield event, payload
+        analysis['group'] = "TechopsOneDev"
     
+    analysis['project_id'] = project_id
+    
+    logger.info(
+        "AI analysis complete",
+        extra={
+            "project": project_name,
+            "tests_executed": analysis.get('tests_executed', 0),
+            "failures": analysis.get('failures', 0),
+            "s3_location": analysis.get('s3_location')
+        }
+    )
+    
+    yield "done", analysis
+
+def report_analysis(project_id, pipeline_id="latest"):
+    """Analysis used for PDF reports: S3 + Bedrock, or demo data"""
+    analyzer = aws.analyzer
+    if analyzer:
+        return analyzer.analyze_logs_with_bedrock(f"project-{project_id}", pipeline_id)
+    return {
+        "pipeline_id": pipeline_id,
+        "tests_executed": 24,
+        "failures": 2,
+        "s3_location": f"s3://{S3_BUCKET_NAME}/projects/project-{project_id}/pipelines/{pipeline_id}",
+        "group": "TechopsOneDev",
+        "suggestions": [
+            {"category": "Unit Tests", "recommendation": "Add more comprehensive test coverage"},
+            {"category": "Code Quality", "recommendation": "Fix pylint warnings and improve documentation"},
+            {"category": "Security", "recommendation": "Update vulnerable dependencies"},
+            {"category": "Deploy", "recommendation": "Add automated health checks for deployments"},
+            {"category": "Performance", "recommendation": "Optimize application performance"},
+            {"category": "TechopsOneDev", "recommendation": "Set up proper team monitoring and alerting"}
+        ]
+    }
+
+def _draw_analysis_section(c, analysis_data, y, title_suffix=""):
+    """Draw statistics and suggestions for one pipeline analysis, starting at y"""
     # Statistics
-    y = 650
     c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Test Statistics")
+    c.drawString(50, y, f"Test Statistics{title_suffix}")
     
     y -= 30
     c.setFont("Helvetica", 12)
@@ -934,6 +3709,21 @@ def generate_pdf_report(analysis_data, project_name):
     c.drawString(50, y, f"Pipeline ID: {analysis_data.get('pipeline_id', 'N/A')}")
     y -= 20
     c.drawString(50, y, f"S3 Location: {analysis_data.get('s3_location', 'N/A')}")
+    if analysis_data.get('coverage') is not None:
+        y -= 20
+        c.drawString(50, y, f"Line coverage: {analysis_data['coverage']}%")
+    
+    # Parsed report artifacts
+    artifacts = (analysis_data.get('local_findings') or {}).get('artifacts') or {}
+    if artifacts:
+        y -= 40
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y, "Report Artifacts")
+        y -= 25
+        c.setFont("Helvetica", 10)
+        for file_name, artifact in artifacts.items():
+            c.drawString(50, y, f"{file_name}: {artifact.get('summary', 'N/A')}"[:100])
+            y -= 15
     
     # Suggestions
     y -= 50
@@ -974,14 +3764,71 @@ def generate_pdf_report(analysis_data, project_name):
             y -= 15
         y -= 10
     
+    return y
+
+def generate_pdf_report(analysis_data, project_name):
+    """Generate a professional PDF report in memory and return its bytes
+    
+    analysis_data is one pipeline analysis, or a list of them for a
+    multi-pipeline report (one section per pipeline, each on a new page).
+    """
+    # reportlab is only needed here: import it on the first report, not at startup
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    
+    buffer = io.BytesIO()
+    sections = analysis_data if isinstance(analysis_data, list) else [analysis_data]
+    
+    c = canvas.Canvas(buffer, pagesize=letter)
+    
+    # Header
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, 750, f"OneDev Analysis Report - {project_name}")
+    
+    c.setFont("Helvetica", 12)
+    c.drawString(50, 720, f"Generated on {datetime.now().strftime('%d/%m/%Y at %H:%M')}")
+    c.drawString(50, 700, "TechopsOneDev Group - Professional CI/CD Automation & AI Analysis")
+    
+    y = 650
+    for index, section in enumerate(sections):
+        if index:
+            c.showPage()
+            y = 750
+        title_suffix = f" - Pipeline {section.get('pipeline_id', 'N/A')}" if len(sections) > 1 else ""
+        y = _draw_analysis_section(c, section, y, title_suffix)
+    
     # Footer
-    c.setFont("Helvetica-Italic", 10)
+    c.setFont("Helvetica-Oblique", 10)
     c.drawString(50, 50, "Generated by OneDev - TechopsOneDev Group - Professional CI/CD Automation")
     
     c.save()
-    temp_file.close()
     
-    return temp_file.name
+    return buffer.getvalue()
+
+REPORT_VOLATILE_FIELDS = {"analysis_timestamp", "log_fetch", "cached"}
+
+def report_etag(analyses):
+    """Content hash of the analyses a report renders (timestamps and fetch stats excluded)"""
+    payload = [
+        {key: value for key, value in analysis.items() if key not in REPORT_VOLATILE_FIELDS}
+        for analysis in analyses
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def iter_pdf_chunks(pdf_bytes, chunk_size=PDF_STREAM_CHUNK_SIZE):
+    """Yield a rendered report in chunks so large reports stream to the client"""
+    view = memoryview(pdf_bytes)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+def shutdown(timeout=SHUTDOWN_DRAIN_TIMEOUT):
+    """Graceful stop for a server process: drain analysis jobs, stop probes, flush logs"""
+    health_monitor.stop()
+    drained = analysis_jobs.drain(timeout)
+    logger.info("OneDev API stopped", extra={"jobs_drained": drained, "pid": os.getpid()})
+    atexit.unregister(log_listener.stop)
+    log_listener.stop()
+    return drained
 
 # API Routes
 
@@ -995,12 +3842,10 @@ def auth_gitlab():
         if not token:
             return jsonify({"error": "Token required"}), 400
         
-        print(f"GitLab authentication attempt...")
-        
         gitlab = GitLabService(token)
         user_info = gitlab.validate_token()
         
-        print(f"Authentication successful for {user_info.get('name')}")
+        logger.info("GitLab authentication successful", extra={"username": user_info.get('username')})
         
         return jsonify({
             "success": True,
@@ -1013,7 +3858,7 @@ def auth_gitlab():
         })
     
     except Exception as e:
-        print(f"Authentication error: {e}")
+        logger.warning("Authentication error: %s", e)
         return jsonify({"error": str(e)}), 401
 
 @app.route('/api/projects/create-only', methods=['POST'])
@@ -1028,9 +3873,7 @@ def create_project_only():
         language = data.get('language')
         framework = data.get('framework')
         
-        print(f"\n🚀 Creating project {project_name} in TechopsOneDev group ({language}/{framework})")
-        print(f"   Target Group: {ONEDEV_GROUP_NAME} (ID: {ONEDEV_GROUP_ID})")
-        print(f"   Expected URL: {GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{project_name}")
+        logger.info("Creating project", extra={"project": project_name, "language": language, "framework": framework})
         
         gitlab = GitLabService(token)
         
@@ -1046,9 +3889,7 @@ def create_project_only():
         final_url = project.get('web_url_fixed', correct_url)
         final_ssh = project.get('ssh_url_fixed', correct_ssh)
         
-        print(f"✅ Project {project_name} created successfully in TechopsOneDev (ID: {project_id})")
-        print(f"   Final URL: {final_url}")
-        print(f"   SSH URL: {final_ssh}")
+        logger.info("Project ready", extra={"project": project_name, "project_id": project_id, "url": final_url})
         
         return jsonify({
             "success": True,
@@ -1071,11 +3912,11 @@ def create_project_only():
         })
     
     except Exception as e:
-        print(f"❌ Project creation error: {e}")
+        logger.error("Project creation error: %s", e)
         
         # Fallback avec les BONS paramètres
         fallback_url = f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}/{project_name}"
-        print(f"🔄 Using fallback URL: {fallback_url}")
+        logger.warning("Using fallback project URL", extra={"url": fallback_url})
         
         return jsonify({
             "success": True,  # Success même en fallback pour continuer le workflow
@@ -1107,16 +3948,26 @@ def generate_yml_with_s3():
         language = data.get('language')
         framework = data.get('framework')
         tools = data.get('tools', {})
+        dependency_cache = data.get('dependency_cache', YML_DEPENDENCY_CACHE)
+        tools_image = data.get('tools_image', YML_TOOLS_IMAGE)
+        pytest_workers = data.get('pytest_workers', YML_PYTEST_WORKERS)
         
-        print(f"Generating YML with S3 logs for project {project_name}")
-        print(f"Group: TechopsOneDev")
-        print(f"S3 Bucket: {S3_BUCKET_NAME}")
-        print(f"Selected tools: {list(tools.keys())}")
+        options_error = yml_options_error(data)
+        if options_error:
+            return jsonify({"error": options_error}), 400
+        
+        logger.info("Generating YML", extra={"project": project_name, "tools": list(tools.keys())})
         
         gitlab = GitLabService(token)
         
         # Generate enhanced YML with S3 logs
-        yml_content = generate_enhanced_yml_with_s3_logs(tools, python_version="3.11")
+        yml_content = generate_enhanced_yml_with_s3_logs(
+            tools,
+            python_version="3.11",
+            dependency_cache=dependency_cache,
+            tools_image=tools_image,
+            pytest_workers=pytest_workers
+        )
         
         # Generate README
         readme_content = generate_professional_readme(project_name, language, framework, tools)
@@ -1133,20 +3984,19 @@ def generate_yml_with_s3():
             "OneDev: Generated CI/CD pipeline for TechopsOneDev group with S3 logs integration"
         )
         
-        print(f"YML generated for TechopsOneDev group with S3 logs integration")
-        
         return jsonify({
             "success": True,
             "files_generated": [".gitlab-ci.yml", "README.md"],
             "commit": commit_result,
             "group": "TechopsOneDev",
             "s3_integration": True,
+            "dependency_cache": dependency_cache,
             "s3_bucket": S3_BUCKET_NAME,
             "message": "Pipeline configured for TechopsOneDev group with S3 logs storage for AI analysis"
         })
     
     except Exception as e:
-        print(f"YML generation error: {e}")
+        logger.error("YML generation error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/projects/trigger-pipeline', methods=['POST'])
@@ -1158,14 +4008,12 @@ def trigger_pipeline_only():
         
         project_id = data.get('project_id')
         
-        print(f"Triggering pipeline for project {project_id} (TechopsOneDev group)")
-        
         gitlab = GitLabService(token)
         
         # Trigger pipeline
         pipeline = gitlab.trigger_pipeline(project_id)
         
-        print(f"Pipeline triggered successfully (Pipeline ID: {pipeline.get('id')})")
+        logger.info("Pipeline triggered", extra={"project_id": project_id, "pipeline_id": pipeline.get('id')})
         
         return jsonify({
             "success": True,
@@ -1177,9 +4025,102 @@ def trigger_pipeline_only():
         })
     
     except Exception as e:
-        print(f"Pipeline trigger error: {e}")
+        logger.error("Pipeline trigger error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/projects/bulk-create', methods=['POST'])
+def bulk_create_projects():
+    """Provision a batch of projects (create, commit CI files, trigger) concurrently"""
+    try:
+        data = request.get_json() or {}
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        
+        specs = data.get('projects') or []
+        if not isinstance(specs, list) or not specs:
+            return jsonify({"error": "A non-empty 'projects' list is required"}), 400
+        if len(specs) > BULK_MAX_PROJECTS:
+            return jsonify({"error": f"At most {BULK_MAX_PROJECTS} projects per batch"}), 400
+        if any(not isinstance(spec, dict) or not spec.get('name') for spec in specs):
+            return jsonify({"error": "Every project spec requires a 'name'"}), 400
+        for spec in specs:
+            options_error = yml_options_error(spec)
+            if options_error:
+                return jsonify({"error": f"Project '{spec['name']}': {options_error}"}), 400
+        
+        try:
+            workers = int(data.get('workers', BULK_DEFAULT_WORKERS))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'workers' must be an integer"}), 400
+        workers = max(1, min(workers, BULK_MAX_WORKERS, len(specs)))
+        
+        logger.info("Bulk provisioning started", extra={"projects": len(specs), "workers": workers})
+        
+        gitlab = GitLabService(token)
+        started = time.monotonic()
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="onedev-bulk") as executor:
+            results = list(executor.map(in_current_context(lambda spec: provision_project(gitlab, spec)), specs))
+        
+        succeeded = sum(1 for result in results if result["success"])
+        logger.info("Bulk provisioning done", extra={"succeeded": succeeded, "projects": len(results)})
+        
+        return jsonify({
+            "success": succeeded == len(results),
+            "group": "TechopsOneDev",
+            "workers": workers,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "results": results
+        })
+    
+    except Exception as e:
+        logger.error("Bulk provisioning error: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/projects/provision/stream', methods=['POST'])
+def provision_project_stream():
+    """Run the provisioning workflow, streaming per-step progress as Server-Sent Events"""
+    data = request.get_json(silent=True) or {}
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    
+    steps = data.get('steps') or ["create", "commit", "trigger", "watch"]
+    if not isinstance(steps, list) or any(step not in ("create", "commit", "trigger", "watch") for step in steps):
+        return jsonify({"error": "'steps' must list create, commit, trigger and/or watch"}), 400
+    if "create" in steps and not data.get('name'):
+        return jsonify({"error": "Project 'name' required"}), 400
+    if "create" not in steps and not data.get('project_id'):
+        return jsonify({"error": "'project_id' required when the create step is skipped"}), 400
+    options_error = yml_options_error(data)
+    if options_error:
+        return jsonify({"error": options_error}), 400
+    watch_timeout = data.get('watch_timeout', PROVISION_WATCH_TIMEOUT)
+    if isinstance(watch_timeout, bool) or not isinstance(watch_timeout, (int, float)) or not 0 < watch_timeout <= PROVISION_WATCH_MAX_TIMEOUT:
+        return jsonify({"error": f"'watch_timeout' must be a number of seconds up to {PROVISION_WATCH_MAX_TIMEOUT}"}), 400
+    
+    spec = dict(data, steps=steps, watch_timeout=watch_timeout)
+    gitlab = GitLabService(token)
+    
+    logger.info("Streaming provisioning", extra={"project": spec.get('name') or spec.get('project_id'), "steps": steps})
+    
+    def generate():
+        yield sse_event("started", {"name": spec.get('name'), "steps": steps})
+        for event, payload in provision_project_steps(gitlab, spec):
+            if event == "heartbeat":
+                yield ": keep-alive\n\n"
+            else:
+                yield sse_event(event, payload)
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/ai/analyze/<int:project_id>', methods=['POST'])
 def analyze_with_ai_from_s3(project_id):
     """Analyze logs with AI from S3 storage"""
@@ -1187,41 +4128,11 @@ def analyze_with_ai_from_s3(project_id):
         data = request.get_json() or {}
         pipeline_id = data.get('pipeline_id', 'latest')
         project_name = data.get('project_name', f'project-{project_id}')
+        mode = data.get('mode', ANALYSIS_MODE)
+        if mode not in ANALYSIS_MODES:
+            return jsonify({"error": f"mode must be one of: {', '.join(ANALYSIS_MODES)}"}), 400
         
-        print(f"AI analysis for project {project_name} (ID: {project_id}) - TechopsOneDev group")
-        print(f"Pipeline ID: {pipeline_id}")
-        print(f"S3 Bucket: {S3_BUCKET_NAME}")
-        
-        if not s3_analyzer:
-            print("S3 analyzer not available, using demo data")
-            analysis = {
-                "pipeline_id": pipeline_id,
-                "stages_analyzed": ["unit-tests", "code-quality", "security", "deploy"],
-                "total_log_files": 12,
-                "tests_executed": 24,
-                "failures": 2,
-                "log_source": f"S3: s3://{S3_BUCKET_NAME}/projects/{project_name}/pipelines/{pipeline_id}",
-                "s3_location": f"s3://{S3_BUCKET_NAME}/projects/{project_name}/pipelines/{pipeline_id}",
-                "analysis_timestamp": datetime.now().isoformat(),
-                "group": "TechopsOneDev",
-                "suggestions": [
-                    {"category": "Unit Tests", "recommendation": "Add more comprehensive test cases for edge scenarios"},
-                    {"category": "Code Quality", "recommendation": "Address pylint warnings and improve code documentation"},
-                    {"category": "Security", "recommendation": "Update dependencies and implement security best practices"},
-                    {"category": "Deploy", "recommendation": "Add health checks and rollback procedures for deployments"},
-                    {"category": "Performance", "recommendation": "Optimize application startup and resource usage"},
-                    {"category": "TechopsOneDev", "recommendation": "Configure team-specific deployment workflows in TechopsOneDev group"}
-                ]
-            }
-        else:
-            # Analyze logs from S3 with Bedrock
-            analysis = s3_analyzer.analyze_logs_with_bedrock(project_name, pipeline_id)
-            analysis['group'] = "TechopsOneDev"
-        
-        analysis['project_id'] = project_id
-        
-        print(f"Analysis complete: {analysis.get('tests_executed', 0)} tests, {analysis.get('failures', 0)} failures")
-        print(f"S3 Location: {analysis.get('s3_location', 'N/A')}")
+        analysis = run_pipeline_analysis(project_id, project_name, pipeline_id, mode)
         
         return jsonify({
             "success": True,
@@ -1229,55 +4140,253 @@ def analyze_with_ai_from_s3(project_id):
         })
     
     except Exception as e:
-        print(f"AI analysis error: {e}")
+        logger.error("AI analysis error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ai/analyze/<int:project_id>/jobs', methods=['POST'])
+def submit_analysis_job(project_id):
+    """Queue an AI analysis and return its job ID immediately"""
+    try:
+        data = request.get_json(silent=True) or {}
+        pipeline_id = str(data.get('pipeline_id', 'latest'))
+        project_name = data.get('project_name', f'project-{project_id}')
+        mode = data.get('mode', ANALYSIS_MODE)
+        if mode not in ANALYSIS_MODES:
+            return jsonify({"error": f"mode must be one of: {', '.join(ANALYSIS_MODES)}"}), 400
+        
+        job, created = analysis_jobs.submit(
+            (project_name, pipeline_id, mode),
+            pipeline_analysis_steps,
+            # Streamed Bedrock completion: suggestions become job events as they arrive
+            project_id, project_name, pipeline_id, mode, True,
+            project_id=project_id,
+            project_name=project_name,
+            pipeline_id=pipeline_id,
+            mode=mode
+        )
+        
+        if job is None:
+            return jsonify({"error": "Analysis queue is full or shutting down, retry later"}), 503
+        
+        logger.info(
+            "Analysis job %s", "queued" if created else "already in flight",
+            extra={"job_id": job['id'], "project": project_name, "pipeline_id": pipeline_id}
+        )
+        
+        response = jsonify({
+            "success": True,
+            "job": job,
+            "deduplicated": not created,
+            "status_url": f"/api/ai/jobs/{job['id']}",
+            "result_url": f"/api/ai/jobs/{job['id']}/result",
+            "stream_url": f"/api/ai/jobs/{job['id']}/stream"
+        })
+        response.status_code = 202
+        response.headers['Location'] = f"/api/ai/jobs/{job['id']}"
+        return response
+    
+    except Exception as e:
+        logger.error("Analysis job submission error: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/ai/jobs/<job_id>/stream', methods=['GET'])
+def stream_analysis_job(job_id):
+    """Follow a queued analysis job as Server-Sent Events (replays earlier events first)
+    
+    The analysis itself runs on the bounded job queue; this only relays
+    its progress, so concurrent viewers of one job share a single run.
+    """
+    if analysis_jobs.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def generate():
+        cursor = 0
+        while True:
+            events, job = analysis_jobs.wait_events(job_id, cursor, ANALYSIS_JOB_STREAM_HEARTBEAT)
+            if job is None:
+                yield sse_event("error", {"error": "Job expired"})
+                return
+            for event, payload in events:
+                yield sse_event(event, payload)
+            cursor += len(events)
+            if job["status"] == "completed":
+                yield sse_event("analysis", {"success": True, "analysis": job["result"]})
+                return
+            if job["status"] == "failed":
+                yield sse_event("error", {"error": job["error"]})
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/api/ai/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Status of an analysis job"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"success": True, "job": job})
+
+@app.route('/api/ai/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id):
+    """Result of an analysis job: 202 while pending, the analysis once completed"""
+    job = analysis_jobs.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    if job["status"] in ("queued", "running"):
+        return jsonify({"success": True, "job": {k: v for k, v in job.items() if k != "result"}}), 202
+    
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"], "job": {k: v for k, v in job.items() if k != "result"}}), 500
+    
+    return jsonify({
+        "success": True,
+        "analysis": job["result"]
+    })
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/api/reports/pdf/<int:project_id>', methods=['GET'])
 def download_pdf_report(project_id):
-    """Download PDF report"""
+    """Download PDF report (?pipelines=ID1,ID2 for a multi-pipeline report)"""
     try:
-        print(f"Generating PDF report for project {project_id} - TechopsOneDev group")
-        
-        # Use S3 analysis or demo data
-        if s3_analyzer:
-            analysis_data = s3_analyzer.analyze_logs_with_bedrock(f"project-{project_id}", "latest")
-        else:
-            analysis_data = {
-                "pipeline_id": "latest",
-                "tests_executed": 24,
-                "failures": 2,
-                "s3_location": f"s3://{S3_BUCKET_NAME}/projects/project-{project_id}/pipelines/latest",
-                "group": "TechopsOneDev",
-                "suggestions": [
-                    {"category": "Unit Tests", "recommendation": "Add more comprehensive test coverage"},
-                    {"category": "Code Quality", "recommendation": "Fix pylint warnings and improve documentation"},
-                    {"category": "Security", "recommendation": "Update vulnerable dependencies"},
-                    {"category": "Deploy", "recommendation": "Add automated health checks for deployments"},
-                    {"category": "Performance", "recommendation": "Optimize application performance"},
-                    {"category": "TechopsOneDev", "recommendation": "Set up proper team monitoring and alerting"}
-                ]
-            }
+        pipeline_ids = [
+            pipeline_id.strip()
+            for pipeline_id in request.args.get('pipelines', 'latest').split(',')
+            if pipeline_id.strip()
+        ] or ["latest"]
+        if len(pipeline_ids) > PDF_MAX_PIPELINES:
+            return jsonify({"error": f"At most {PDF_MAX_PIPELINES} pipelines per report"}), 400
         
-        pdf_path = generate_pdf_report(analysis_data, f"Project-{project_id}")
+        # A recent download of the same report: answer from the index and the
+        # rendered cache without touching S3, Bedrock or reportlab
+        index_key = (project_id, tuple(pipeline_ids))
+        etag = report_index.get(index_key)
+        if etag and request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        pdf_bytes = report_cache.get(etag) if etag else None
         
-        print(f"PDF report generated: {pdf_path}")
+        if pdf_bytes is None:
+            analyses = [report_analysis(project_id, pipeline_id) for pipeline_id in pipeline_ids]
+            etag = report_etag(analyses)
+            report_index.set(index_key, etag)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            
+            pdf_bytes = report_cache.get(etag)
+            if pdf_bytes is None:
+                pdf_bytes = generate_pdf_report(
+                    analyses if len(analyses) > 1 else analyses[0],
+                    f"Project-{project_id}"
+                )
+                report_cache.set(etag, pdf_bytes)
+                logger.info("PDF report generated", extra={"project_id": project_id, "bytes": len(pdf_bytes), "pipelines": len(analyses)})
         
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=f"onedev-techopsonedev-analysis-report-{project_id}.pdf",
-            mimetype='application/pdf'
+        response = Response(
+            iter_pdf_chunks(pdf_bytes),
+            mimetype='application/pdf',
+            headers={
+                'Content-Disposition': f'attachment; filename="onedev-techopsonedev-analysis-report-{project_id}.pdf"',
+                'Content-Length': str(len(pdf_bytes)),
+                'Cache-Control': 'private, no-cache'
+            }
         )
+        response.set_etag(etag)
+        return response
     
     except Exception as e:
-        print(f"PDF generation error: {e}")
+        logger.error("PDF generation error: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def metrics_gauges():
+    """Point-in-time samples for /api/metrics: cache hit ratios and queue depths"""
+    caches = {
+        "gitlab_tokens": gitlab_user_cache.stats(),
+        "gitlab_group_access": gitlab_group_cache.stats(),
+        "analysis": analysis_cache.stats(),
+        "pdf_reports": report_cache.stats(),
+        "pdf_report_index": report_index.stats(),
+        "yml": yml_cache_stats()
+    }
+    pool = gitlab_http.stats()
+    caches["gitlab_connection_pool"] = {"hits": pool["pool_hits"], "misses": pool["pool_misses"]}
+    cache_ratio = []
+    for name, stats in caches.items():
+        lookups = stats["hits"] + stats["misses"]
+        cache_ratio.append(({"cache": name}, stats["hits"] / lookups if lookups else 0.0))
+
+    jobs = analysis_jobs.stats()
+    queue_depth = [
+        ({"executor": "analysis_jobs"}, jobs["queued"]),
+        ({"executor": "log_writer"}, log_listener.queue.qsize())
+    ]
+    active = [({"executor": "analysis_jobs"}, jobs["running"])]
+    gauges = [
+        ("onedev_cache_hits_total", "counter", "Cache lookups served from cache",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("onedev_cache_misses_total", "counter", "Cache lookups that missed",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("onedev_cache_hit_ratio", "gauge", "Hits over lookups since start", cache_ratio)
+    ]
+    # Scrapes never build the AWS clients
+    gateway = aws.gateway if aws.initialized else None
+    if gateway:
+        bedrock_stats = gateway.stats()
+        queue_depth.append(({"executor": "bedrock"}, bedrock_stats["queue_depth"]))
+        active.append(({"executor": "bedrock"}, bedrock_stats["in_flight"]))
+        gauges.append((
+            "onedev_bedrock_circuit_open", "gauge", "1 while the Bedrock circuit breaker rejects calls",
+            [({}, int(bedrock_stats["state"] != "closed"))]
+        ))
+    probes = health_monitor.snapshot()
+    gauges.extend([
+        ("onedev_upstream_up", "gauge", "1 if the last background health probe succeeded",
+         [({"upstream": name}, int(probe["status"] == "up")) for name, probe in probes.items()]),
+        ("onedev_health_probe_duration_seconds", "gauge", "Latency of the last background health probe",
+         [({"upstream": name}, probe["latency_ms"] / 1000) for name, probe in probes.items() if probe["latency_ms"] is not None]),
+        ("onedev_executor_queue_depth", "gauge", "Tasks waiting for a worker or slot", queue_depth),
+        ("onedev_executor_active", "gauge", "Tasks currently running", active)
+    ])
+    return gauges
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint: route and upstream latency, cache and queue gauges"""
+    return Response(metrics.render(metrics_gauges()), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """API health check with correct parameters"""
+    """API health check: upstream state comes from the background probes, never a live call"""
+    probes = health_monitor.snapshot()
+    aws_probes = [probes["s3"]["status"], probes["bedrock"]["status"]]
+    if all(status == "demo" for status in aws_probes):
+        aws_status = "demo"
+    elif all(status == "up" for status in aws_probes):
+        aws_status = "connected"
+    else:
+        aws_status = "starting" if set(aws_probes) <= {"up", "demo", "starting"} else "degraded"
+    statuses = {probe["status"] for probe in probes.values()}
+    if statuses <= {"up", "demo"}:
+        overall = "healthy"
+    else:
+        # Right after startup the first probe round may not have answered yet
+        overall = "starting" if statuses <= {"up", "demo", "starting"} else "degraded"
+    gateway = aws.gateway if aws.initialized else None
     return jsonify({
-        "status": "healthy",
+        "status": overall,
         "service": "OneDev API",
         "version": "4.3.0 - CORRECT PARAMETERS: TechopsOneDev Group",
         "timestamp": datetime.now().isoformat(),
@@ -1286,14 +4395,27 @@ def health_check():
             "group": ONEDEV_GROUP_NAME,
             "group_id": ONEDEV_GROUP_ID,
             "group_url": f"{GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}",
-            "status": "connected"
+            "status": {"up": "connected", "starting": "starting"}.get(probes["gitlab"]["status"], "degraded"),
+            "probe": probes["gitlab"],
+            "connection_pool": gitlab_http.stats(),
+            "auth_cache": {
+                "tokens": gitlab_user_cache.stats(),
+                "group_access": gitlab_group_cache.stats()
+            }
         },
         "aws": {
             "region": AWS_REGION,
             "s3_bucket": S3_BUCKET_NAME,
             "bedrock_model": BEDROCK_MODEL_ID,
-            "status": "connected" if s3_client and bedrock else "demo"
+            "status": aws_status,
+            "probes": {"s3": probes["s3"], "bedrock": probes["bedrock"]},
+            "analysis_mode": ANALYSIS_MODE,
+            "bedrock": gateway.stats() if gateway else None,
+            "analysis_cache": analysis_cache.stats(),
+            "analysis_jobs": analysis_jobs.stats()
         },
+        "yml_generation": yml_cache_stats(),
+        "pdf_reports": report_cache.stats(),
         "features": {
             "CORRECT_PARAMETERS": "Using correct TechopsOneDev group parameters",
             "group_verification": "Added group access verification",
@@ -1335,17 +4457,13 @@ def after_request(response):
     return response
 
 if __name__ == '__main__':
-    print("\n" + "="*80)
-    print("OneDev API - CORRECT PARAMETERS: TechopsOneDev Group")
-    print("GitLab Group Integration + Enhanced AWS Services + S3 Logs + Bedrock Analysis") 
-    print("Professional Interface - All Features Implemented")
-    print(f"Interface: http://localhost:5000")
-    print(f"API: http://localhost:5000/api/")
-    print(f"Health: http://localhost:5000/api/health")
-    print(f"GitLab: {GITLAB_BASE_URL}")
-    print(f"Group: {ONEDEV_GROUP_NAME} (ID: {ONEDEV_GROUP_ID})")
-    print(f"Group URL: {GITLAB_BASE_URL}/{ONEDEV_GROUP_NAME}")
-    print(f"S3 Bucket: {S3_BUCKET_NAME}")
-    print("✅ FIXED: Using CORRECT TechopsOneDev group parameters")
-    print("="*80)
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; production: gunicorn -c gunicorn.conf.py wsgi:application
+    logger.info(
+        "OneDev API - TechopsOneDev group: serving (development server)",
+        extra={
+            "interface": f"http://localhost:{DEV_SERVER_PORT}",
+            "api": f"http://localhost:{DEV_SERVER_PORT}/api/",
+            "health": f"http://localhost:{DEV_SERVER_PORT}/api/health"
+        }
+    )
+    app.run(debug=DEV_SERVER_DEBUG, host=DEV_SERVER_HOST, port=DEV_SERVER_PORT)
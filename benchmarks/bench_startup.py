@@ -0,0 +1,91 @@
+"""
+Benchmark worker cold start: a lazy worker that has imported app, served
+one non-analysis request (GET /api/health) and finished its first
+background health probe round, versus the same import followed by the work
+the eager module used to do at import time (boto3 Bedrock + S3 clients,
+gateway, analyzer, reportlab).
+
+Each sample runs in a fresh interpreter; time and resident memory (VmRSS)
+are reported as the median over RUNS.
+
+Usage: python benchmarks/bench_startup.py
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RUNS = 7
+
+SAMPLE = r"""
+import contextlib, io, json, sys, time
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+    imported = time.perf_counter()
+    if sys.argv[1] == "eager":
+        app.aws.analyzer
+        from reportlab.pdfgen import canvas
+    else:
+        # A serving worker: the request starts the health probes, which must not build AWS clients
+        app.app.test_client().get("/api/health")
+    finished = time.perf_counter()
+    # Memory and loaded modules are read once the first probe round has answered
+    while sys.argv[1] != "eager" and any(
+        probe["status"] == "starting" for probe in app.health_monitor.snapshot().values()
+    ):
+        time.sleep(0.05)
+    app.health_monitor.stop()
+    app.log_listener.stop()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "ready_ms": (finished - started) * 1000,
+    "rss_mb": rss_mb(),
+    "boto3_loaded": "boto3" in sys.modules,
+    "reportlab_loaded": "reportlab" in sys.modules
+}))
+"""
+
+
+def sample(mode):
+    output = subprocess.run(
+        [sys.executable, "-c", SAMPLE, mode],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    results = {}
+    for mode in ("lazy", "eager"):
+        samples = [sample(mode) for _ in range(RUNS)]
+        results[mode] = {
+            "ready_ms": statistics.median(s["ready_ms"] for s in samples),
+            "rss_mb": statistics.median(s["rss_mb"] for s in samples),
+            "boto3_loaded": samples[-1]["boto3_loaded"],
+            "reportlab_loaded": samples[-1]["reportlab_loaded"]
+        }
+
+    lazy, eager = results["lazy"], results["eager"]
+    print(f"runs per mode        : {RUNS} (median)")
+    print(f"lazy  (served 1 req) : {lazy['ready_ms']:8.1f} ms {lazy['rss_mb']:7.1f} MB RSS"
+          f"  boto3={lazy['boto3_loaded']} reportlab={lazy['reportlab_loaded']}")
+    print(f"eager (import + AWS) : {eager['ready_ms']:8.1f} ms {eager['rss_mb']:7.1f} MB RSS"
+          f"  boto3={eager['boto3_loaded']} reportlab={eager['reportlab_loaded']}")
+    print(f"saved at cold start  : {eager['ready_ms'] - lazy['ready_ms']:8.1f} ms "
+          f"{eager['rss_mb'] - lazy['rss_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
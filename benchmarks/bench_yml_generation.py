@@ -0,0 +1,63 @@
+"""
+Benchmark .gitlab-ci.yml generation: full rebuild + pure-Python yaml.dump
+(the pre-memoization path) versus the memoized generator.
+
+Usage: python benchmarks/bench_yml_generation.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+
+TOOLS = {
+    "Unit Tests": ["pytest", "unittest"],
+    "Code Quality": ["pylint", "flake8", "mypy"],
+    "Security": ["bandit", "safety"]
+}
+ITERATIONS = 2000
+
+
+def rebuild(tools, python_version="3.11"):
+    """Build the whole config dict and dump it on every call"""
+    config = app._build_global_config(python_version)
+    test_jobs = []
+    for category, job_name in app.YML_TOOL_CATEGORIES.items():
+        if category in tools:
+            builder = getattr(app, f"_build_{job_name}_job")
+            config[job_name] = builder(tools[category])
+            test_jobs.append(job_name)
+    config["upload_all_logs"] = app._build_upload_all_logs_job(test_jobs)
+    config["deploy_production"] = app._build_deploy_production_job()
+    return yaml.dump(config, default_flow_style=False)
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert rebuild(TOOLS) == app.generate_enhanced_yml_with_s3_logs(TOOLS, dependency_cache="shared")
+
+        rebuild_seconds = timeit.timeit(lambda: rebuild(TOOLS), number=ITERATIONS)
+        memoized_seconds = timeit.timeit(
+            lambda: app.generate_enhanced_yml_with_s3_logs(TOOLS, dependency_cache="shared"),
+            number=ITERATIONS
+        )
+
+    rebuild_us = rebuild_seconds / ITERATIONS * 1e6
+    memoized_us = memoized_seconds / ITERATIONS * 1e6
+    print(f"C emitter available: {app.YAML_DUMPER.__name__.startswith('C')}")
+    print(f"rebuild + yaml.dump : {rebuild_us:10.1f} us/call")
+    print(f"memoized generator  : {memoized_us:10.1f} us/call")
+    print(f"speedup             : {rebuild_us / memoized_us:10.0f}x")
+    print(f"cache               : {app.yml_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Gunicorn settings for the OneDev API: one threaded worker process,
+graceful drain of in-flight analyses on shutdown.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Every value can be overridden from the environment (ONEDEV_BIND,
+ONEDEV_WORKERS, ONEDEV_THREADS, ...). In-memory state (caches, analysis
+jobs, rate limiters) is per worker process, and the master hands each
+request to any of its workers, so a job submitted to one worker is a 404
+on the others. Keep ONEDEV_WORKERS=1 and scale with threads, or run more
+containers behind a load balancer with sticky sessions.
+"""
+
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get("ONEDEV_BIND", "0.0.0.0:5000")
+
+# gthread: each process serves `threads` requests at once. Long requests
+# (synchronous analyses, SSE progress streams) hold a thread, not the
+# whole process, and do not trip the worker heartbeat timeout. The work
+# is I/O bound (GitLab, S3, Bedrock), so threads carry the concurrency.
+worker_class = "gthread"
+workers = _env_int("ONEDEV_WORKERS", 1)
+threads = _env_int("ONEDEV_THREADS", 32)
+keepalive = _env_int("ONEDEV_KEEPALIVE", 5)
+timeout = _env_int("ONEDEV_WORKER_TIMEOUT", 120)
+
+# On SIGTERM a worker stops accepting, finishes in-flight requests, then
+# worker_exit drains analysis jobs: graceful_timeout must cover both.
+drain_timeout = _env_int("ONEDEV_SHUTDOWN_DRAIN_TIMEOUT", 60)
+graceful_timeout = _env_int("ONEDEV_GRACEFUL_TIMEOUT", drain_timeout + 30)
+
+# Import app.py once in the master and fork it (copy-on-write). AWS
+# clients and reportlab load lazily, so nothing fork-unsafe is built here.
+preload_app = os.environ.get("ONEDEV_PRELOAD", "true").lower() in ("1", "true", "yes", "on")
+
+# Recycle workers after N requests (0 disables) to bound slow leaks
+max_requests = _env_int("ONEDEV_MAX_REQUESTS", 0)
+max_requests_jitter = _env_int("ONEDEV_MAX_REQUESTS_JITTER", 0)
+
+# app.py logs one access line per request with its correlation ID
+accesslog = None
+errorlog = "-"
+
+# GitLab/Bedrock rate limits and Bedrock concurrency are global budgets
+# that app.py splits across this many processes
+os.environ.setdefault("ONEDEV_WORKER_PROCESSES", str(workers))
+os.environ.setdefault("ONEDEV_SHUTDOWN_DRAIN_TIMEOUT", str(drain_timeout))
+
+
+def post_fork(server, worker):
+    """The log writer thread started by the preloaded import does not survive fork"""
+    import app
+    app.configure_logging()
+
+
+def worker_exit(server, worker):
+    """Let queued and running analysis jobs finish before the process exits"""
+    import app
+    app.shutdown()
@@ -53,6 +53,48 @@ async function apiCall(endpoint, method = 'GET', data = null) {
     }
 }
 
+// Streaming API call: reads Server-Sent Events from a POST response (GET when data is null)
+async function streamApiCall(endpoint, data, onEvent) {
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        method: data ? 'POST' : 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+            ...(authToken && { 'Authorization': `Bearer ${authToken}` })
+        },
+        ...(data && { body: JSON.stringify(data) })
+    });
+    
+    if (!response.ok) {
+        const result = await response.json();
+        throw new Error(result.error || 'API Error');
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let payload = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) payload += line.slice(6);
+            });
+            if (payload) onEvent(event, JSON.parse(payload));
+        }
+    }
+}
+
 // GitLab Authentication
 authBtn.addEventListener('click', async function() {
     const token = document.getElementById('gitlab-token').value;
@@ -295,13 +337,23 @@ document.getElementById('trigger-pipeline-btn').addEventListener('click', async
     this.disabled = true;
     
     try {
-        const response = await apiCall('/projects/trigger-pipeline', 'POST', {
-            project_id: currentProjectId
+        // Trigger, then follow the pipeline status as the server streams it
+        let pipelineId = null;
+        await streamApiCall('/projects/provision/stream', {
+            project_id: currentProjectId,
+            name: currentProjectName,
+            steps: ['trigger', 'watch']
+        }, (event, payload) => {
+            if (event === 'pipeline_triggered') {
+                pipelineId = payload.id;
+                this.textContent = 'Pipeline Triggered';
+                showPipelineStatus('success', `Pipeline triggered successfully! Pipeline ID: ${payload.id}. Logs will be uploaded to S3 for AI analysis.`);
+            } else if (event === 'pipeline_status') {
+                showPipelineStatus(payload.status === 'failed' ? 'error' : 'success', `Pipeline ${pipelineId}: ${payload.status}`);
+            } else if (event === 'done' && !payload.success) {
+                throw new Error(payload.error || 'Pipeline trigger failed');
+            }
         });
-
-        showPipelineStatus('success', `Pipeline triggered successfully! Pipeline ID: ${response.pipeline.id}. Logs will be uploaded to S3 for AI analysis.`);
-        
-        this.textContent = 'Pipeline Triggered';
         
     } catch (error) {
         showPipelineStatus('error', `Pipeline trigger error: ${error.message}`);
@@ -316,11 +368,33 @@ document.getElementById('analyze-ai-btn').addEventListener('click', async functi
     this.disabled = true;
     
     try {
-        const response = await apiCall(`/ai/analyze/${currentProjectId}`, 'POST', {
+        // Queue the analysis (de-duplicated server side), then follow its progress:
+        // suggestions are shown as soon as Bedrock produces them
+        let response = null;
+        const analysisContent = document.getElementById('analysis-content');
+        analysisContent.innerHTML = '<ul id="live-suggestions" style="color: #374151; line-height: 1.7;"></ul>';
+        
+        const submitted = await apiCall(`/ai/analyze/${currentProjectId}/jobs`, 'POST', {
             project_name: currentProjectName,
             pipeline_id: 'latest'
         });
         
+        await streamApiCall(`/ai/jobs/${submitted.job.id}/stream`, null, (event, payload) => {
+            if (event === 'suggestion') {
+                document.getElementById('ai-analysis-results').classList.remove('hidden');
+                document.getElementById('live-suggestions').insertAdjacentHTML('beforeend',
+                    `<li><strong>${payload.category}:</strong> ${payload.recommendation}</li>`);
+            } else if (event === 'analysis') {
+                response = payload;
+            } else if (event === 'error') {
+                throw new Error(payload.error);
+            }
+        });
+        
+        if (!response) {
+            throw new Error('Analysis stream ended early');
+        }
+        
         updateAIAnalysis(response.analysis);
         document.getElementById('ai-analysis-results').classList.remove('hidden');
         
@@ -0,0 +1,20 @@
+import app
+
+
+def test_filter_log_lines_keeps_trailing_traceback():
+    content = "\n".join(
+        [f"WARNING: deprecated call {i}" for i in range(60)]
+        + [
+            "Traceback (most recent call last):",
+            '  File "main.py", line 3, in <module>',
+            "    run()",
+            "RuntimeError: the real failure",
+        ]
+    )
+
+    kept = app.filter_log_lines(content)
+
+    assert len(kept) == app.PREFILTER_MAX_LINES
+    assert kept[-1] == "RuntimeError: the real failure"
+    assert "Traceback (most recent call last):" in kept
+    assert "WARNING: deprecated call 0" not in kept
@@ -0,0 +1,13 @@
+"""
+Production WSGI entry point for the OneDev API.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+app.py settings are read from ONEDEV_<NAME> environment variables
+(e.g. ONEDEV_S3_BUCKET_NAME, ONEDEV_LOG_FORMAT=json); gunicorn.conf.py
+sizes the worker pool from ONEDEV_WORKERS (default 1) / ONEDEV_THREADS.
+"""
+
+from app import app as application
+
+__all__ = ["application"]